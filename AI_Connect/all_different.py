@@ -0,0 +1,120 @@
+from typing import List
+
+from bitset_domains import BitsetDomains
+
+
+class AllDifferent:
+    """
+    Régin-style all-different propagator, one per attribute of a BitsetDomains.
+
+    Every attribute is a bipartite graph between the houses and the
+    attribute's values (house h -- value v while v is in h's domain). A value
+    can stay in a domain only if some maximum matching of that graph uses the
+    edge. propagate() computes a matching covering all houses and removes
+    every edge that no such matching contains, which is generalized arc
+    consistency for the whole attribute in one call. It subsumes the naked
+    single (a house with one value left) and hidden single (a value with one
+    house left) rules and also catches Hall sets such as two houses sharing
+    the same two values.
+
+    Matchings are kept per attribute between calls and only repaired: edges
+    whose value left the domain are dropped, and only the houses that lost
+    their match look for an augmenting path. Since repairing works from any
+    starting matching, they need no undo on backtracking.
+    """
+
+    def __init__(self, domains: BitsetDomains):
+        self.domains = domains
+        self.num_House = domains.num_House
+        # house_match[attr][h] = value index matched to house h (-1 = none)
+        self.house_match: List[List[int]] = [[-1] * self.num_House for _ in range(domains.num_attributes)]
+        # value_match[attr][v] = house index matched to value v (-1 = none)
+        self.value_match: List[List[int]] = [[-1] * len(values) for values in domains.values]
+
+    def propagate(self, attr_idx: int) -> bool:
+        """Filter one attribute. Returns False if no matching covers every house."""
+        domains = self.domains
+        masks = domains.masks
+        num_attributes = domains.num_attributes
+        num_values = len(domains.values[attr_idx])
+        house_vars = range(attr_idx, attr_idx + self.num_House * num_attributes, num_attributes)
+        dom = [masks[var] for var in house_vars]
+
+        if not self._match(attr_idx, dom):
+            return False
+        house_match = self.house_match[attr_idx]
+        value_match = self.value_match[attr_idx]
+
+        # value graph: v -> v' if an unmatched edge (v, h) leads to the house h matched to v'
+        successors = [0] * num_values
+        free_values = 0
+        for value_idx in range(num_values):
+            if value_match[value_idx] < 0:
+                free_values |= 1 << value_idx
+        for h in range(self.num_House):
+            matched = house_match[h]
+            others = dom[h] & ~(1 << matched)
+            while others:
+                low = others & -others
+                others ^= low
+                successors[low.bit_length() - 1] |= 1 << matched
+
+        # transitive closure (Warshall on bit rows); reach[v] includes v
+        reach = [successors[v] | 1 << v for v in range(num_values)]
+        for k in range(num_values):
+            k_bit = 1 << k
+            reach_k = reach[k]
+            for v in range(num_values):
+                if reach[v] & k_bit:
+                    reach[v] |= reach_k
+
+        # values on an alternating path from a free value
+        from_free = 0
+        remaining = free_values
+        while remaining:
+            low = remaining & -remaining
+            remaining ^= low
+            from_free |= reach[low.bit_length() - 1]
+
+        # (h, v) survives if matched, reachable from a free value, or on an
+        # alternating cycle v -> h -> matched value -> ... -> v
+        for h, var in enumerate(house_vars):
+            matched = house_match[h]
+            keep = dom[h] & (from_free | reach[matched])
+            if keep != dom[h]:
+                domains.set_mask(var, keep)
+        return True
+
+    def _match(self, attr_idx: int, dom: List[int]) -> bool:
+        """Repair the stored matching to cover every house; False if impossible."""
+        house_match = self.house_match[attr_idx]
+        value_match = self.value_match[attr_idx]
+
+        for h in range(self.num_House):
+            matched = house_match[h]
+            if matched >= 0 and not dom[h] >> matched & 1:
+                house_match[h] = -1
+                value_match[matched] = -1
+
+        for h in range(self.num_House):
+            if house_match[h] < 0 and not self._augment(h, dom, house_match, value_match, [0]):
+                return False
+        return True
+
+    def _augment(self, h: int, dom: List[int], house_match: List[int], value_match: List[int],
+                 visited: List[int]) -> bool:
+        """Kuhn's augmenting path search from house h; visited[0] is a value bitmask."""
+        candidates = dom[h] & ~visited[0]
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            if visited[0] & low:
+                continue
+            visited[0] |= low
+            value_idx = low.bit_length() - 1
+            other = value_match[value_idx]
+            if other < 0 or self._augment(other, dom, house_match, value_match, visited):
+                house_match[h] = value_idx
+                value_match[value_idx] = h
+                return True
+        return False
@@ -0,0 +1,125 @@
+import argparse
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from constraint_solver import ENGINES
+from solve_puzzles import make_chunks, run_chunk
+
+HOUSE_PATTERN = re.compile(r"\bhouse (\d+)\b", re.IGNORECASE)
+
+
+def parse_house(question):
+    """House number a question asks about ("... who lives in House 3?"), or None."""
+    match = HOUSE_PATTERN.search(question)
+    return int(match.group(1)) if match else None
+
+
+def answer_question(solution, question, choices):
+    """
+    Answer one multiple-choice question from a solved grid.
+
+    The question names a house and an attribute; the attribute names of the mc
+    set ("FavoriteSport") do not match the keys PreProcess extracts, so the
+    answer is the choice that is one of the house's values instead (values are
+    compared lowercased). Returns None if there is no solution, no house or no
+    matching choice.
+    """
+    if not solution:
+        return None
+    houseNr = parse_house(question)
+    if houseNr is None or houseNr not in solution:
+        return None
+
+    house_values = set(solution[houseNr].values())
+    for choice in choices:
+        if choice.lower() in house_values:
+            return choice
+    return None
+
+
+def solve_grids(puzzle_texts, max_workers=None, engine="bitset", limits=None):
+    """
+    Solve each distinct puzzle text once on a process pool.
+
+    Returns the in-run memo {puzzle_text: solution or None}. The texts are
+    expected lowercased, like the Gridmode driver feeds them.
+    """
+    unique_texts = list(dict.fromkeys(puzzle_texts))
+    puzzles = [(idx, puzzle_text, None) for idx, puzzle_text in enumerate(unique_texts)]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    memo = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_chunk, chunk, engine, None, limits): chunk
+                   for chunk in make_chunks(puzzles, max_workers)}
+        for future in as_completed(futures):
+            try:
+                records = future.result()
+            except Exception as e:
+                records = [{"idx": idx, "status": "error", "solution": None, "error": repr(e)}
+                           for idx, _, _ in futures[future]]
+            for record in records:
+                if record["status"] == "error":
+                    print(f"Error at puzzle {record['idx']}: {record['error']}")
+                memo[unique_texts[record["idx"]]] = record["solution"]
+    return memo
+
+
+def run_mc(mc, max_workers=None, engine="bitset", limits=None):
+    """
+    Answer every question of the mc DataFrame (puzzle, question, choices,
+    answer columns). Returns (predictions, number of grids solved).
+    """
+    puzzle_texts = mc.puzzle.str.lower()
+    memo = solve_grids(puzzle_texts, max_workers, engine, limits)
+    predictions = [answer_question(memo[text], question, choices)
+                   for text, question, choices in zip(puzzle_texts, mc.question, mc.choices)]
+    return predictions, len(memo)
+
+
+def print_mc_report(mc, predictions, wall_time, grids):
+    by_size = defaultdict(lambda: [0, 0])
+    for question_id, prediction, answer in zip(mc.id, predictions, mc.answer):
+        # ids look like "lgp-test-6x4-37#mc-16"
+        size = question_id.split("-")[2]
+        by_size[size][0] += 1
+        by_size[size][1] += prediction is not None and prediction.lower() == answer.lower()
+
+    print("\n=== MC evaluation ===")
+    print(f"{'size':>8} {'questions':>10} {'correct':>8} {'accuracy':>10}")
+    for size in sorted(by_size):
+        questions, correct = by_size[size]
+        print(f"{size:>8} {questions:>10} {correct:>8} {correct / questions:>10.2%}")
+    questions = sum(stats[0] for stats in by_size.values())
+    correct = sum(stats[1] for stats in by_size.values())
+    print(f"{'overall':>8} {questions:>10} {correct:>8} {correct / questions if questions else 0.0:>10.2%}")
+
+    throughput = questions / wall_time if wall_time > 0 else 0.0
+    print(f"\nWall time: {wall_time:.2f}s for {questions} questions over {grids} grids "
+          f"({throughput:.1f} questions/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer the mc questions by solving their grids.")
+    parser.add_argument("--data", default="mc-00000-of-00001.parquet")
+    parser.add_argument("--workers", type=int, default=None, help="pool size (default: os.cpu_count())")
+    parser.add_argument("--engine", choices=ENGINES, default="bitset")
+    parser.add_argument("--time-limit", type=float, default=None, help="wall time budget per grid in seconds")
+    args = parser.parse_args()
+
+    mc = pd.read_parquet(args.data)
+
+    start = time.perf_counter()
+    predictions, grids = run_mc(mc, args.workers, args.engine, {"time_limit": args.time_limit})
+    wall_time = time.perf_counter() - start
+
+    print_mc_report(mc, predictions, wall_time, grids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+
+import pandas as pd
+from preProccesPuzzle import PreProcess
+from constraint_solver import ConstraintSolver, ENGINES
+from solve_puzzles import constraint_factory
+
+
+STAGES = ["preprocess", "factory", "solver_init", "solve"]
+COUNTERS = ["backtrack_count", "propagation_calls", "revision_count", "conflict_count"]
+
+
+def select_subset(gridmode, per_size):
+    """Fixed, stratified subset: the first `per_size` puzzles of every grid size."""
+    return list(gridmode.groupby("size", sort=True).head(per_size).index)
+
+
+def _run_pipeline(puzzle_text, engine):
+    """Run the pipeline once and return (stage seconds, solver, solution)."""
+    timings = {}
+
+    start = time.perf_counter()
+    attrs, clues = PreProcess().proccess(puzzle_text)
+    timings["preprocess"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    constrains = constraint_factory(attrs, clues)
+    timings["factory"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Cs = ConstraintSolver(attrs, constrains)
+    timings["solver_init"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    solution = Cs.solve(engine=engine)
+    timings["solve"] = time.perf_counter() - start
+
+    return timings, Cs, solution
+
+
+def benchmark_puzzle(puzzle_text, engine="bitset", repeat=3):
+    """
+    Benchmark one puzzle.
+
+    Stage times are the minimum over `repeat` runs. Peak memory is measured
+    in a separate tracemalloc run so it does not distort the timings.
+    """
+    best = {stage: float("inf") for stage in STAGES}
+    for _ in range(repeat):
+        timings, Cs, solution = _run_pipeline(puzzle_text, engine)
+        for stage in STAGES:
+            best[stage] = min(best[stage], timings[stage])
+
+    tracemalloc.start()
+    _run_pipeline(puzzle_text, engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {f"{stage}_s": best[stage] for stage in STAGES}
+    result.update(Cs.get_statistics())
+    result["peak_kib"] = peak / 1024
+    result["solved"] = solution is not None
+    return result
+
+
+def summarize(puzzles):
+    """Per-size mean / p95 of every stage plus counter totals."""
+    by_size = defaultdict(list)
+    for puzzle in puzzles:
+        by_size[puzzle["size"]].append(puzzle)
+
+    summary = {}
+    for size, rows in sorted(by_size.items()):
+        entry = {"puzzles": len(rows), "solved": sum(row["solved"] for row in rows)}
+        for stage in STAGES:
+            samples = sorted(row[f"{stage}_s"] for row in rows)
+            entry[f"{stage}_mean_s"] = statistics.fmean(samples)
+            entry[f"{stage}_p95_s"] = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        for counter in COUNTERS:
+            entry[counter] = sum(row.get(counter, 0) for row in rows)
+        entry["peak_kib_max"] = max(row["peak_kib"] for row in rows)
+        summary[size] = entry
+    return summary
+
+
+def run(args):
+    gridmode = pd.read_parquet(args.data)
+    subset = select_subset(gridmode, args.per_size)
+
+    puzzles = []
+    for count, idx in enumerate(subset):
+        print(f"Benchmark: {count + 1}/{len(subset)}", end="\r")
+        result = benchmark_puzzle(gridmode.puzzle.iloc[idx].lower(), args.engine, args.repeat)
+        result["idx"] = int(idx)
+        result["size"] = gridmode["size"].iloc[idx]
+        puzzles.append(result)
+    print()
+
+    report = {
+        "meta": {
+            "engine": args.engine,
+            "per_size": args.per_size,
+            "repeat": args.repeat,
+            "data": args.data,
+            "python": platform.python_version(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "summary": summarize(puzzles),
+        "puzzles": puzzles,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print_summary(report["summary"])
+    print(f"Results written to {args.out}")
+
+
+def print_summary(summary):
+    print(f"{'size':>6} {'n':>4} " + " ".join(f"{stage + ' ms':>15}" for stage in STAGES)
+          + f" {'backtracks':>11} {'peak KiB':>9}")
+    for size, entry in summary.items():
+        times = " ".join(f"{1000 * entry[f'{stage}_mean_s']:>15.3f}" for stage in STAGES)
+        print(f"{size:>6} {entry['puzzles']:>4} {times} {entry['backtrack_count']:>11} {entry['peak_kib_max']:>9.1f}")
+
+
+def compare(args):
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.load(f)["summary"]
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)["summary"]
+
+    print(f"{'size':>6} {'stage':>17} {'old ms':>10} {'new ms':>10} {'change':>8}")
+    for size in sorted(set(old) & set(new)):
+        for stage in STAGES:
+            key = f"{stage}_mean_s"
+            old_ms, new_ms = 1000 * old[size][key], 1000 * new[size][key]
+            change = (new_ms - old_ms) / old_ms if old_ms else 0.0
+            print(f"{size:>6} {stage:>17} {old_ms:>10.3f} {new_ms:>10.3f} {change:>+8.1%}")
+        for counter in COUNTERS:
+            if old[size].get(counter) != new[size].get(counter):
+                print(f"{size:>6} {counter:>17} {old[size].get(counter, 0):>10} {new[size].get(counter, 0):>10}")
+
+    missing = set(old) ^ set(new)
+    if missing:
+        print(f"Sizes only in one run: {sorted(missing)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ZebraLogic solver pipeline stage by stage.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="benchmark a stratified subset and write a JSON report")
+    run_parser.add_argument("--data", default="Gridmode-00000-of-00001.parquet")
+    run_parser.add_argument("--per-size", type=int, default=10, help="puzzles per grid size")
+    run_parser.add_argument("--repeat", type=int, default=3, help="timing runs per puzzle (minimum is kept)")
+    run_parser.add_argument("--engine", choices=ENGINES, default="bitset")
+    run_parser.add_argument("--out", default="benchmark.json")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="diff two benchmark reports")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+from typing import Dict, List, Set, Tuple
+
+
+class BitsetDomains:
+    """
+    Compact domain store for the (house, attribute) variables of a grid puzzle.
+
+    Every value of an attribute is interned to a small integer (its index in the
+    attribute's value list), so the domain of one (house, attribute) variable is
+    a single int bitmask. Bit i is set if value i is still possible.
+
+    The masks live in one flat list indexed by variable id:
+        var = (houseNr - 1) * num_attributes + attr_index
+
+    Singleton tests, removals and "which houses can still hold value v" are
+    plain bit operations on these ints.
+
+    Every change made through set_mask() is recorded on a trail as
+    (var, old_mask). A search can take a mark() before it prunes and undo(mark)
+    on failure, so backtracking only costs as much as the pruning actually done.
+    """
+
+    def __init__(self, attributes: Dict[str, List[str]], num_House: int):
+        self.num_House = num_House
+        self.all_houses = (1 << num_House) - 1
+        self.attr_keys: List[str] = list(attributes.keys())
+        self.num_attributes = len(self.attr_keys)
+        self.attr_index: Dict[str, int] = {key: i for i, key in enumerate(self.attr_keys)}
+
+        # value interning per attribute
+        self.values: List[List[str]] = [list(attributes[key]) for key in self.attr_keys]
+        self.value_index: List[Dict[str, int]] = [
+            {value: i for i, value in enumerate(values)} for values in self.values
+        ]
+        self.full_masks: List[int] = [(1 << len(values)) - 1 for values in self.values]
+
+        self.masks: List[int] = []
+        for _ in range(num_House):
+            self.masks.extend(self.full_masks)
+
+        self.trail: List[Tuple[int, int]] = []
+
+    # ------------------------------------------------------------------
+    # index helpers
+    # ------------------------------------------------------------------
+
+    def var(self, houseNr: int, attr_key: str) -> int:
+        return (houseNr - 1) * self.num_attributes + self.attr_index[attr_key]
+
+    def decode(self, attr_idx: int, mask: int) -> List[str]:
+        """Return the values encoded in a mask, in interned (index) order."""
+        values = self.values[attr_idx]
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(values[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+    # ------------------------------------------------------------------
+    # domain access by (house, attribute)
+    # ------------------------------------------------------------------
+
+    def mask(self, houseNr: int, attr_key: str) -> int:
+        return self.masks[self.var(houseNr, attr_key)]
+
+    def size(self, houseNr: int, attr_key: str) -> int:
+        return self.mask(houseNr, attr_key).bit_count()
+
+    # ------------------------------------------------------------------
+    # trail
+    # ------------------------------------------------------------------
+
+    def set_mask(self, var: int, mask: int) -> None:
+        """Overwrite the domain of a variable and record the old mask on the trail."""
+        old = self.masks[var]
+        if old != mask:
+            self.trail.append((var, old))
+            self.masks[var] = mask
+
+    def mark(self) -> int:
+        return len(self.trail)
+
+    def undo(self, mark: int) -> None:
+        """Roll every domain back to the state it had when mark() returned `mark`."""
+        trail = self.trail
+        masks = self.masks
+        while len(trail) > mark:
+            var, old = trail.pop()
+            masks[var] = old
+
+    def houses_of(self, attr_idx: int, value_idx: int) -> int:
+        """
+        Return a bitmask of the houses that can still hold the value.
+
+        Bit (houseNr - 1) is set if the value is in that house's domain.
+        """
+        bit = 1 << value_idx
+        masks = self.masks
+        num_attributes = self.num_attributes
+        houses = 0
+        for h in range(self.num_House):
+            if masks[h * num_attributes + attr_idx] & bit:
+                houses |= 1 << h
+        return houses
+
+    def restrict(self, attr_idx: int, value_idx: int, houses: int) -> int:
+        """
+        Remove the value from every house outside the `houses` bitmask.
+
+        Returns the bitmask of houses that can still hold the value afterwards;
+        0 means the value has nowhere left to go.
+        """
+        bit = 1 << value_idx
+        masks = self.masks
+        num_attributes = self.num_attributes
+        remaining = 0
+        for h in range(self.num_House):
+            var = h * num_attributes + attr_idx
+            if masks[var] & bit:
+                if houses >> h & 1:
+                    remaining |= 1 << h
+                else:
+                    self.set_mask(var, masks[var] & ~bit)
+        return remaining
+
+    def as_dict(self) -> Dict[int, Dict[str, Set[str]]]:
+        """Decode into the nested {houseNr: {attr_key: set(values)}} layout."""
+        return {
+            houseNr: {key: set(self.decode(attr_idx, self.mask(houseNr, key)))
+                      for attr_idx, key in enumerate(self.attr_keys)}
+            for houseNr in range(1, self.num_House + 1)
+        }
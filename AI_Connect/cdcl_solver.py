@@ -0,0 +1,269 @@
+from typing import Callable, List, Optional
+
+
+def luby(i: int) -> int:
+    """i-th element (from 1) of the Luby restart sequence 1 1 2 1 1 2 4 1 1 2 ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class CDCLSolver:
+    """
+    Small pure-Python CDCL SAT solver.
+
+    Variables are 1..num_vars, literals are non-zero ints (DIMACS style: -v is
+    the negation of v). Implements:
+    - two watched literals per clause; the first literal of a reason clause is
+      the literal it implied
+    - first-UIP conflict analysis with non-chronological backjumping; learned
+      clauses are kept for the rest of the solve
+    - VSIDS-like variable activities (bumped in conflict analysis, decayed per
+      conflict) with phase saving
+    - Luby restarts (RESTART_BASE conflicts per unit)
+
+    check_budget, if given, is called with (decisions, propagations) before
+    every decision and may raise to abort the search.
+    """
+
+    RESTART_BASE = 32
+    VAR_DECAY = 0.95
+
+    def __init__(self, num_vars: int, check_budget: Optional[Callable[[int, int], None]] = None):
+        self.num_vars = num_vars
+        self.check_budget = check_budget
+
+        self.clauses: List[List[int]] = []
+        # watches[lit] lists the clauses watching lit (visited when lit becomes false);
+        # negative literals index from the end, -v lands on 2 * num_vars + 1 - v
+        self.watches: List[List[int]] = [[] for _ in range(2 * num_vars + 1)]
+
+        # assign[v]: 1 true, -1 false, 0 unassigned
+        self.assign = [0] * (num_vars + 1)
+        self.level = [0] * (num_vars + 1)
+        self.reason: List[Optional[int]] = [None] * (num_vars + 1)
+        self.trail: List[int] = []
+        self.trail_lim: List[int] = []
+        self.qhead = 0
+
+        self.activity = [0.0] * (num_vars + 1)
+        self.var_inc = 1.0
+        # saved phases, true first: most variables here are one-hot choices
+        self.phase = [1] * (num_vars + 1)
+
+        self.ok = True
+
+        self.decisions = 0
+        self.propagations = 0
+        self.conflicts = 0
+        self.learned = 0
+        self.restarts = 0
+
+    def _value(self, lit: int) -> int:
+        value = self.assign[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, lits: List[int]) -> bool:
+        """Add a problem clause (before solve). Returns False once the formula is unsatisfiable."""
+        if not self.ok:
+            return False
+
+        clause = []
+        for lit in lits:
+            if -lit in clause:
+                return True  # tautology
+            if lit not in clause:
+                clause.append(lit)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            value = self._value(clause[0])
+            if value == -1:
+                self.ok = False
+            elif value == 0:
+                self._enqueue(clause[0], None)
+        else:
+            self._attach(clause)
+        return self.ok
+
+    def _attach(self, clause: List[int]) -> int:
+        clause_idx = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(clause_idx)
+        self.watches[clause[1]].append(clause_idx)
+        return clause_idx
+
+    def _enqueue(self, lit: int, reason: Optional[int]) -> None:
+        var = abs(lit)
+        self.assign[var] = 1 if lit > 0 else -1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def _propagate(self) -> Optional[int]:
+        """Unit propagation over the watches. Returns a conflicting clause index or None."""
+        self.propagations += 1
+        assign, clauses, watches = self.assign, self.clauses, self.watches
+
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+
+            watching = watches[false_lit]
+            kept = []
+            i, count = 0, len(watching)
+            while i < count:
+                clause_idx = watching[i]
+                i += 1
+                clause = clauses[clause_idx]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+
+                first = clause[0]
+                first_value = assign[abs(first)] if first > 0 else -assign[abs(first)]
+                if first_value == 1:
+                    kept.append(clause_idx)
+                    continue
+
+                # look for a new literal to watch
+                for k in range(2, len(clause)):
+                    lit = clause[k]
+                    if (assign[abs(lit)] if lit > 0 else -assign[abs(lit)]) != -1:
+                        clause[1], clause[k] = lit, false_lit
+                        watches[lit].append(clause_idx)
+                        break
+                else:
+                    kept.append(clause_idx)
+                    if first_value == -1:
+                        kept.extend(watching[i:])
+                        watches[false_lit] = kept
+                        return clause_idx
+                    self._enqueue(first, clause_idx)
+
+            watches[false_lit] = kept
+
+        return None
+
+    def _analyze(self, conflict: int):
+        """First-UIP analysis. Returns (learned clause, backjump level)."""
+        seen = [False] * (self.num_vars + 1)
+        current_level = len(self.trail_lim)
+        learnt = [0]
+        pending = 0
+        lit = 0
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+
+        while True:
+            for other in clause:
+                if other == lit:
+                    continue
+                var = abs(other)
+                if not seen[var] and self.level[var] > 0:
+                    seen[var] = True
+                    self._bump(var)
+                    if self.level[var] == current_level:
+                        pending += 1
+                    else:
+                        learnt.append(other)
+
+            # next literal of the current level on the trail
+            while not seen[abs(self.trail[index])]:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            seen[abs(lit)] = False
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reason[abs(lit)]]
+
+        learnt[0] = -lit
+        if len(learnt) == 1:
+            return learnt, 0
+
+        # watch the literal of the highest remaining level second
+        best = max(range(1, len(learnt)), key=lambda k: self.level[abs(learnt[k])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def _bump(self, var: int) -> None:
+        self.activity[var] += self.var_inc
+        if self.activity[var] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.var_inc *= 1e-100
+
+    def _cancel_until(self, level: int) -> None:
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            var = abs(lit)
+            self.phase[var] = 1 if lit > 0 else -1
+            self.assign[var] = 0
+            self.reason[var] = None
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = start
+
+    def _pick_branch(self) -> int:
+        best_var, best_activity = 0, -1.0
+        assign, activity = self.assign, self.activity
+        for var in range(1, self.num_vars + 1):
+            if not assign[var] and activity[var] > best_activity:
+                best_var, best_activity = var, activity[var]
+        return best_var
+
+    def solve(self) -> Optional[List[bool]]:
+        """
+        Run CDCL. Returns the model as a list indexed by variable (index 0 is
+        unused), or None if the formula is unsatisfiable.
+        """
+        if not self.ok or self._propagate() is not None:
+            self.ok = False
+            return None
+
+        restart_limit = self.RESTART_BASE * luby(1)
+        conflicts_since_restart = 0
+
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts_since_restart += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return None
+
+                learnt, backjump_level = self._analyze(conflict)
+                self._cancel_until(backjump_level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    self._enqueue(learnt[0], self._attach(learnt))
+                self.learned += 1
+                self.var_inc /= self.VAR_DECAY
+
+                if conflicts_since_restart >= restart_limit:
+                    self.restarts += 1
+                    conflicts_since_restart = 0
+                    restart_limit = self.RESTART_BASE * luby(self.restarts + 1)
+                    self._cancel_until(0)
+                continue
+
+            var = self._pick_branch()
+            if not var:
+                return [False] + [value > 0 for value in self.assign[1:]]
+
+            self.decisions += 1
+            if self.check_budget is not None:
+                self.check_budget(self.decisions, self.propagations)
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(var if self.phase[var] > 0 else -var, None)
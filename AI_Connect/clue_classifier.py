@@ -1,51 +1,70 @@
 import re
-from typing import Tuple
+from typing import Iterable, List, Tuple
+
 
 class ClueClassifier:
-    
+
+    #do not question thes black magic it works
+    # (optional leading words like "is" / "somewhere" / "there" are left out:
+    # they never change whether a pattern occurs in a clue, but they keep the
+    # regex engine from skipping ahead to the first literal)
+    PATTERNS = {
+        'POSITION_ABSOLUTE': re.compile(r'in\s+the\s+(\w+)\s+house', re.IGNORECASE),
+        'POSITION_ABSOLUTE_NEGATIVE': re.compile(r'is\s+not\s+in\s+the\s+(\w+)\s+house', re.IGNORECASE),
+        'NEXT_TO': re.compile(r'(?:and|are)\s+next\s+to\s+each\s+other', re.IGNORECASE),
+        'DIRECT_LEFT': re.compile(r'directly\s+(?:left|to\s+the\s+left)\s+of', re.IGNORECASE),
+        'DIRECT_RIGHT': re.compile(r'directly\s+(?:right|to\s+the\s+right)\s+of', re.IGNORECASE),
+        'LEFT': re.compile(r'to\s+the\s+left\s+of', re.IGNORECASE),
+        'RIGHT': re.compile(r'to\s+the\s+right\s+of', re.IGNORECASE),
+        'DISTANCE': re.compile(r'(?:is|are)\s+(?:\w+\s+)?house[s]?\s+between', re.IGNORECASE),
+        'IDENTITY': re.compile(r'is\s+', re.IGNORECASE),
+    }
+
+    # the first type whose pattern occurs anywhere in the clue wins
+    PRECEDENCE = [
+        'POSITION_ABSOLUTE_NEGATIVE', 'DISTANCE', 'NEXT_TO', 'DIRECT_LEFT', 'DIRECT_RIGHT',
+        'LEFT', 'RIGHT', 'POSITION_ABSOLUTE', 'IDENTITY',
+    ]
+
+    # a word every match of the type's pattern contains; a substring test on
+    # the lowercased clue is much cheaper than the regex search it skips
+    KEYWORDS = {
+        'POSITION_ABSOLUTE': 'house',
+        'POSITION_ABSOLUTE_NEGATIVE': 'not',
+        'NEXT_TO': 'next',
+        'DIRECT_LEFT': 'directly',
+        'DIRECT_RIGHT': 'directly',
+        'LEFT': 'left',
+        'RIGHT': 'right',
+        'DISTANCE': 'between',
+        'IDENTITY': 'is',
+    }
+
     def __init__(self):
+        self.patterns = self.PATTERNS
+        self.checks = [(name, self.KEYWORDS[name], self.PATTERNS[name].search) for name in self.PRECEDENCE]
 
-        #do not question thes black magic it works
-        self.patterns = {
-            'POSITION_ABSOLUTE': re.compile(r'(?:is\s+)?in\s+the\s+(\w+)\s+house', re.IGNORECASE),
-            'POSITION_ABSOLUTE_NEGATIVE': re.compile(r'is\s+not\s+in\s+the\s+(\w+)\s+house', re.IGNORECASE),
-            'NEXT_TO': re.compile(r'(?:and|are)\s+next\s+to\s+each\s+other', re.IGNORECASE),
-            'DIRECT_LEFT': re.compile(r'(?:is\s+)?directly\s+(?:left|to\s+the\s+left)\s+of', re.IGNORECASE),
-            'DIRECT_RIGHT': re.compile(r'(?:is\s+)?directly\s+(?:right|to\s+the\s+right)\s+of', re.IGNORECASE),
-            'LEFT': re.compile(r'(?:is\s+)?(?:somewhere\s+)?to\s+the\s+left\s+of', re.IGNORECASE),
-            'RIGHT': re.compile(r'(?:is\s+)?(?:somewhere\s+)?to\s+the\s+right\s+of', re.IGNORECASE),
-            'DISTANCE': re.compile(r'(?:there\s+)?(?:is|are)\s+(?:\w+\s+)?house[s]?\s+between', re.IGNORECASE),
-            'IDENTITY': re.compile(r'is\s+', re.IGNORECASE),
-        }
-    
     def classify(self, clue: str) -> Tuple[str, str]:
         clue = clue.strip()
-        
-        if self.patterns['POSITION_ABSOLUTE_NEGATIVE'].search(clue):
-            return (clue, 'POSITION_ABSOLUTE_NEGATIVE')
-        
-        if self.patterns['DISTANCE'].search(clue):
-            return (clue, 'DISTANCE')
-        
-        if self.patterns['NEXT_TO'].search(clue):
-            return (clue, 'NEXT_TO')
-        
-        if self.patterns['DIRECT_LEFT'].search(clue):
-            return (clue, 'DIRECT_LEFT')
-        
-        if self.patterns['DIRECT_RIGHT'].search(clue):
-            return (clue, 'DIRECT_RIGHT')
-        
-        if self.patterns['LEFT'].search(clue):
-            return (clue, 'LEFT')
-        
-        if self.patterns['RIGHT'].search(clue):
-            return (clue, 'RIGHT')
-        
-        if self.patterns['POSITION_ABSOLUTE'].search(clue):
-            return (clue, 'POSITION_ABSOLUTE')
-        
-        if self.patterns['IDENTITY'].search(clue):
-            return (clue, 'IDENTITY')
-        
+        lowered = clue.lower()
+
+        for name, keyword, search in self.checks:
+            if keyword in lowered and search(clue):
+                return (clue, name)
         return (clue, 'UNKNOWN')
+
+    def classify_many(self, clues: Iterable[str]) -> List[Tuple[str, str]]:
+        return [self.classify(clue) for clue in clues]
+
+
+# shared instance, the patterns are compiled once at import
+CLASSIFIER = ClueClassifier()
+
+
+def classify(clue: str) -> Tuple[str, str]:
+    return CLASSIFIER.classify(clue)
+
+
+def classify_many(clues: Iterable[str]) -> List[Tuple[str, str]]:
+    """Classify a whole puzzle (or the clues.txt corpus) in one call."""
+    return CLASSIFIER.classify_many(clues)
@@ -0,0 +1,68 @@
+import argparse
+import time
+from collections import defaultdict
+
+import pandas as pd
+from preProccesPuzzle import PreProcess
+from constraint_solver import ConstraintSolver, ENGINES
+from solve_puzzles import constraint_factory
+
+
+def compare_engines(gridmode, limit=None):
+    """
+    Solve every puzzle with each engine and collect solve times per grid size.
+
+    Parsing is done once per puzzle and not timed. Returns
+    {size: {engine: [seconds, ...]}} and the indices where the engines
+    disagree on whether a solution exists.
+    """
+    ppp = PreProcess()
+    times = defaultdict(lambda: defaultdict(list))
+    disagreements = []
+
+    total_puzzles = len(gridmode) if limit is None else min(limit, len(gridmode))
+    for idx in range(total_puzzles):
+        attrs, clues = ppp.proccess(gridmode.puzzle.iloc[idx].lower())
+        constrains = constraint_factory(attrs, clues)
+        size = gridmode["size"].iloc[idx]
+
+        found = {}
+        for engine in ENGINES:
+            Cs = ConstraintSolver(attrs, constrains)
+            start = time.perf_counter()
+            solution = Cs.solve(engine=engine)
+            times[size][engine].append(time.perf_counter() - start)
+            found[engine] = solution is not None
+
+        if len(set(found.values())) > 1:
+            disagreements.append(idx)
+
+    return times, disagreements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ConstraintSolver engines on the Gridmode parquet.")
+    parser.add_argument("--data", default="Gridmode-00000-of-00001.parquet")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N puzzles")
+    args = parser.parse_args()
+
+    gridmode = pd.read_parquet(args.data)
+    times, disagreements = compare_engines(gridmode, args.limit)
+
+    print(f"{'size':>6} " + " ".join(f"{engine + ' ms/puzzle':>18}" for engine in ENGINES))
+    totals = defaultdict(float)
+    for size in sorted(times):
+        row = []
+        for engine in ENGINES:
+            samples = times[size][engine]
+            totals[engine] += sum(samples)
+            row.append(f"{1000 * sum(samples) / len(samples):>18.3f}")
+        print(f"{size:>6} " + " ".join(row))
+    print(f"{'total':>6} " + " ".join(f"{totals[engine]:>17.3f}s" for engine in ENGINES))
+
+    if disagreements:
+        print(f"Engines disagree on satisfiability for puzzles: {disagreements}")
+
+
+if __name__ == "__main__":
+    main()
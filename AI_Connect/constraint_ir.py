@@ -0,0 +1,190 @@
+from array import array
+from typing import List, Tuple
+
+from bitset_domains import BitsetDomains
+
+
+# Kind codes of the flat constraint records. Every clue type is lowered to one
+# of these position relations between the houses p1 and p2 of two values:
+KIND_TRUE = 0       # always satisfied (e.g. an identity clue that could not be parsed)
+KIND_FALSE = 1      # never satisfied (e.g. a relational clue that could not be parsed)
+KIND_OFFSET = 2     # p2 - p1 == param >= 0 (identity: 0, directly left/right: 1)
+KIND_DISTANCE = 3   # |p1 - p2| == param    (next to: 1, n houses between: n + 1)
+KIND_BEFORE = 4     # p1 < p2               (somewhere left/right)
+KIND_AT = 5         # p1 == param
+KIND_NOT_AT = 6     # p1 != param
+
+
+def record_violated(kind: int, param: int, p1: int, p2: int) -> bool:
+    """
+    Verdict of one record given the houses of its two values (0 = unassigned).
+
+    A record over an unassigned value is not violated. Shared by
+    ConstraintIR.violated and the constraint-level checks in constraints.py,
+    so the semantics of a kind live in one place.
+    """
+    if kind == KIND_TRUE:
+        return False
+    if kind == KIND_FALSE:
+        return True
+
+    if not p1:
+        return False
+    if kind == KIND_AT:
+        return p1 != param
+    if kind == KIND_NOT_AT:
+        return p1 == param
+
+    if not p2:
+        return False
+    if kind == KIND_OFFSET:
+        return p2 - p1 != param
+    if kind == KIND_DISTANCE:
+        return abs(p1 - p2) != param
+    return p1 >= p2  # KIND_BEFORE
+
+
+class ConstraintIR:
+    """
+    Compiled, flat form of the parsed puzzle constraints.
+
+    Each constraint is lowered (via its get_ir() method) to one record:
+        kind code, value slot 1, value slot 2, integer parameter
+
+    A value slot packs an (attribute index, value index) pair of the
+    BitsetDomains interning into one int:
+        slot = attr_idx * value_stride + value_idx
+
+    The records are stored in parallel arrays, so the solver never has to touch
+    the text-parsing Constraint objects after compilation. Record i belongs to
+    the i-th constraint of the list it was compiled from.
+
+    Positions are given as a flat list indexed by slot (houseNr, 0 = unassigned).
+
+    watchers[slot] lists the records that read a slot, so after placing one
+    value only those records have to be checked (first_violation_at).
+    """
+
+    def __init__(self, constraints: list, domains: BitsetDomains):
+        self.value_stride = max(len(values) for values in domains.values)
+        self.num_slots = domains.num_attributes * self.value_stride
+        self.count = len(constraints)
+
+        self.kind = array("b")
+        self.slot1 = array("h")
+        self.slot2 = array("h")
+        self.param = array("b")
+
+        for constraint in constraints:
+            kind, attr1, attr2, param = constraint.get_ir()
+            self.kind.append(kind)
+            self.slot1.append(self._slot_of(attr1, domains))
+            self.slot2.append(self._slot_of(attr2, domains))
+            self.param.append(param)
+
+        self.watchers: List[List[int]] = [[] for _ in range(self.num_slots)]
+        for idx in range(self.count):
+            for slot in self.slots_of(idx):
+                if idx not in self.watchers[slot]:
+                    self.watchers[slot].append(idx)
+
+    def _slot_of(self, attr, domains: BitsetDomains) -> int:
+        if not attr:
+            return 0
+        attr_val, attr_key = attr
+        attr_idx = domains.attr_index[attr_key]
+        return attr_idx * self.value_stride + domains.value_index[attr_idx][attr_val]
+
+    def slot(self, attr_idx: int, value_idx: int) -> int:
+        return attr_idx * self.value_stride + value_idx
+
+    def unpack(self, slot: int) -> Tuple[int, int]:
+        """Return the (attr_idx, value_idx) pair of a slot."""
+        return divmod(slot, self.value_stride)
+
+    def slots_of(self, idx: int) -> List[int]:
+        """Value slots read by record idx."""
+        kind = self.kind[idx]
+        if kind == KIND_TRUE or kind == KIND_FALSE:
+            return []
+        if kind == KIND_AT or kind == KIND_NOT_AT:
+            return [self.slot1[idx]]
+        return [self.slot1[idx], self.slot2[idx]]
+
+    def empty_positions(self) -> List[int]:
+        return [0] * self.num_slots
+
+    def violated(self, idx: int, positions: List[int]) -> bool:
+        """Whether record idx is violated. A record over an unassigned value is not."""
+        return record_violated(self.kind[idx], self.param[idx],
+                               positions[self.slot1[idx]], positions[self.slot2[idx]])
+
+    def first_violation_at(self, slot: int, positions: List[int]) -> int:
+        """
+        Evaluate the records watching slot against the positions.
+
+        Returns the index of the first violated one, or -1 if none is violated.
+        Enough after placing that one value if the positions were consistent
+        before: no other record can have changed its verdict.
+        """
+        kind, param, slot1, slot2 = self.kind, self.param, self.slot1, self.slot2
+        for idx in self.watchers[slot]:
+            if record_violated(kind[idx], param[idx], positions[slot1[idx]], positions[slot2[idx]]):
+                return idx
+        return -1
+
+    def propagate(self, idx: int, domains: BitsetDomains) -> bool:
+        """
+        Run the propagator of record idx on the domains.
+
+        Prunes the house bitmasks of the record's values. Returns False if the
+        record can no longer be satisfied.
+        """
+        kind = self.kind[idx]
+        if kind == KIND_TRUE:
+            return True
+        if kind == KIND_FALSE:
+            return False
+
+        param = self.param[idx]
+        all_houses = domains.all_houses
+        attr1, value1 = divmod(self.slot1[idx], self.value_stride)
+
+        if kind == KIND_AT:
+            if param > domains.num_House:
+                return False
+            if not domains.restrict(attr1, value1, 1 << (param - 1)):
+                return False
+            # The value only fits one house, so assign it there directly
+            domains.set_mask((param - 1) * domains.num_attributes + attr1, 1 << value1)
+            return True
+
+        if kind == KIND_NOT_AT:
+            return bool(domains.restrict(attr1, value1, all_houses & ~(1 << (param - 1))))
+
+        attr2, value2 = divmod(self.slot2[idx], self.value_stride)
+        houses2 = domains.houses_of(attr2, value2)
+
+        if kind == KIND_OFFSET:
+            # p1 = p2 - param, p2 = p1 + param
+            houses1 = domains.restrict(attr1, value1, houses2 >> param)
+            if not houses1:
+                return False
+            return bool(domains.restrict(attr2, value2, (houses1 << param) & all_houses))
+
+        if kind == KIND_DISTANCE:
+            support2 = ((houses2 << param) | (houses2 >> param)) & all_houses
+            houses1 = domains.restrict(attr1, value1, support2)
+            if not houses1:
+                return False
+            support1 = ((houses1 << param) | (houses1 >> param)) & all_houses
+            return bool(domains.restrict(attr2, value2, support1))
+
+        # KIND_BEFORE: p1 is left of the rightmost house of p2,
+        # p2 is right of the leftmost house of p1
+        below_max2 = (1 << (houses2.bit_length() - 1)) - 1 if houses2 else 0
+        houses1 = domains.restrict(attr1, value1, below_max2)
+        if not houses1:
+            return False
+        above_min1 = all_houses & ~(((houses1 & -houses1) << 1) - 1)
+        return bool(domains.restrict(attr2, value2, above_min1))
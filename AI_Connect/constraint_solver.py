@@ -1,6 +1,51 @@
-from typing import Dict, List, Tuple, Optional
+import random
+import time
+from typing import Dict, Iterator, List, Tuple, Optional, Union
+from collections import deque
 from constraints import Constraint
-import copy
+from bitset_domains import BitsetDomains
+from constraint_ir import ConstraintIR
+from all_different import AllDifferent
+from solver_profile import SolverProfile
+from cdcl_solver import luby
+from nogood_store import NogoodStore, Decision
+
+
+# bump whenever a change can alter the solutions the solver returns; it is part
+# of the SolutionCache key, so old cache entries are not reused afterwards
+SOLVER_VERSION = "2"
+
+ENGINES = ["bitset", "tensor", "sat"]
+VARIABLE_ORDERS = ["mrv", "domwdeg"]
+VALUE_ORDERS = ["index", "lcv"]
+
+
+class SolveTimeout:
+    """
+    Result of a solve that hit one of its budgets.
+    
+    Distinct from None (no solution exists): the search was cut short, so the
+    puzzle may or may not be solvable. reason is "time", "nodes" or
+    "propagations"; statistics are the solver counters at that point.
+    """
+    
+    def __init__(self, reason: str, statistics: Dict[str, int], seconds: float):
+        self.reason = reason
+        self.statistics = statistics
+        self.seconds = seconds
+    
+    def __repr__(self) -> str:
+        return f"SolveTimeout(reason={self.reason!r}, seconds={self.seconds:.3f}, statistics={self.statistics})"
+
+
+class _BudgetExceeded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Restart(Exception):
+    pass
 
 
 class ConstraintSolver:
@@ -8,223 +53,504 @@ class ConstraintSolver:
     Smart Constraint Satisfaction Problem (CSP) solver for logic puzzles.
     
     Uses:
-    - Constraint propagation (AC-3 like) for domain pruning
+    - Constraint propagation (AC-3 like) for domain pruning, running
+      ConstraintIR.propagate over the compiled constraint records
     - Backtracking search with Minimum Remaining Values (MRV) heuristic
     - Forward checking to reduce search space
+    
+    Domains are kept in a BitsetDomains store: each (house, attribute) domain is
+    an int bitmask over the interned values of that attribute. All pruning goes
+    through the store's trail, so backtracking undoes to a trail mark instead of
+    copying domains.
+    
+    The parsed constraints are compiled once into a flat ConstraintIR; search
+    and propagation only work on that IR.
     """
     
-    def __init__(self, attributes: Dict[str, List[str]], constraints: List[Constraint]):
+    # failures per Luby unit before a restart
+    RESTART_BASE = 16
+    
+    def __init__(self, attributes: Dict[str, List[str]], constraints: List[Constraint],
+                 profile: Optional[SolverProfile] = None):
 
         self.attributes = attributes
         self.constraints = constraints
         self.num_House = len(next(iter(attributes.values())))
         
         self.domains = self._initialize_domains()
+        self.ir = ConstraintIR(constraints, self.domains)
+        self.neighbours = self._build_neighbour_index()
+        self.all_different = AllDifferent(self.domains)
         
         self.assignment = {}
+        # reverse index of the current assignment: IR value slot -> houseNr (0 = unassigned)
+        self.positions: List[int] = self.ir.empty_positions()
         
         self.backtrack_count = 0
         self.propagation_calls = 0
-        
-    def _initialize_domains(self) -> Dict[int, Dict[str, set]]:
-        domains = {}
-        for pos in range(1, self.num_House + 1):
-            domains[pos] = {}
-            for attr_key, attr_values in self.attributes.items():
-                domains[pos][attr_key] = set(attr_values)
-        return domains
+        self.revision_count = 0
+        self.conflict_count = 0
+        self.restart_count = 0
+        
+        # search heuristics of the running solve (see solve)
+        self.variable_order = "mrv"
+        self.value_order = "index"
+        self.rng: Optional[random.Random] = None
+        self.restart_limit: Optional[int] = None
+        self.failure_count = 0
+        # dom/wdeg: constraint weights (bumped on wipe-out) and their sum per value slot
+        self.weights = [1] * self.ir.count
+        self.slot_weights = [len(watchers) for watchers in self.ir.watchers]
+        
+        # conflict-directed backjumping (see _backtrack_explained); explanations
+        # is None unless the running solve tracks conflict sets
+        self.backjumping = False
+        self.explanations: Optional[List[int]] = None
+        self.decisions: List[Decision] = []
+        self.decided: Dict[Decision, int] = {}
+        self.placed_depth = [0] * len(self.ir.watchers)
+        self.conflict = 0
+        self.nogoods: Optional[NogoodStore] = None
+        self.backjump_count = 0
+        
+        # budgets of the running solve (None = unlimited)
+        self.deadline: Optional[float] = None
+        self.node_limit: Optional[int] = None
+        self.propagation_limit: Optional[int] = None
+        
+        # opt-in instrumentation; without a profile the plain methods run
+        self.profile = profile
+        if profile is not None:
+            profile.attach(self)
+        
+    def _initialize_domains(self) -> BitsetDomains:
+        return BitsetDomains(self.attributes, self.num_House)
     
-    def solve(self) -> Optional[Dict[int, Dict[str, str]]]:
-        if not self._propagate():
-            return None
+    def _build_neighbour_index(self) -> List[List[List[int]]]:
+        """
+        Build the variable -> constraint index once per puzzle.
         
-        result = self._backtrack({})
+        neighbours[attr_idx][value_idx] lists the constraints that mention that
+        (attribute, value) pair, i.e. whose propagator reads the houses that can
+        still hold the value.
+        """
+        return [[self.ir.watchers[self.ir.slot(attr_idx, value_idx)] for value_idx in range(len(values))]
+                for attr_idx, values in enumerate(self.domains.values)]
+    
+    def get_statistics(self) -> Dict[str, int]:
+        return {
+            "backtrack_count": self.backtrack_count,
+            "propagation_calls": self.propagation_calls,
+            "revision_count": self.revision_count,
+            "conflict_count": self.conflict_count,
+            "restart_count": self.restart_count,
+            "backjump_count": self.backjump_count,
+            "nogood_count": self.nogoods.learned if self.nogoods is not None else 0,
+            "nogood_prunes": self.nogoods.hits if self.nogoods is not None else 0,
+        }
+    
+    def solve(self, engine: str = "bitset", time_limit: Optional[float] = None,
+              node_limit: Optional[int] = None, propagation_limit: Optional[int] = None,
+              variable_order: str = "mrv", value_order: str = "index", restarts: bool = False,
+              seed: Optional[int] = None, backjumping: bool = False,
+              nogood_limit: int = 0) -> Union[Dict[int, Dict[str, str]], SolveTimeout, None]:
+        """
+        Solve the puzzle with the chosen engine.
+        
+        engine="bitset" (default) searches on the trailed BitsetDomains,
+        engine="tensor" runs the NumPy TensorEngine on the same IR and
+        engine="sat" the CNF encoding on the CDCLSolver (SatEngine).
+        
+        time_limit (seconds), node_limit (search nodes) and propagation_limit
+        (propagation calls) bound the search. When one is hit, a SolveTimeout
+        with the statistics so far is returned instead of a solution; None
+        still means that no solution exists.
+        
+        Search heuristics (bitset engine):
+        - variable_order: "mrv" (smallest domain first) or "domwdeg" (smallest
+          domain size / weighted degree; a constraint's weight grows each time
+          it wipes out a domain)
+        - value_order: "index" (interning order) or "lcv" (least constraining
+          value: the one that removes the fewest values elsewhere)
+        - restarts: break variable ties at random (seeded by seed) and restart
+          the search after a Luby sequence of failures; dom/wdeg weights are
+          kept across restarts
+        - backjumping: track conflict sets and jump straight back to the
+          latest decision a failure depends on
+        - nogood_limit: learn the conflict sets of failed nodes as nogoods,
+          keeping at most this many (least recently used are evicted); they
+          are kept across restarts
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if variable_order not in VARIABLE_ORDERS:
+            raise ValueError(f"Unknown variable order: {variable_order}")
+        if value_order not in VALUE_ORDERS:
+            raise ValueError(f"Unknown value order: {value_order}")
+        if nogood_limit < 0:
+            raise ValueError(f"nogood_limit must not be negative: {nogood_limit}")
+        
+        self.variable_order = variable_order
+        self.value_order = value_order
+        self.rng = random.Random(seed) if restarts else None
+        self.backjumping = backjumping
+        self.nogoods = NogoodStore(nogood_limit) if nogood_limit else None
+        self.explanations = [0] * len(self.ir.watchers) if backjumping or self.nogoods is not None else None
+        
+        start = time.perf_counter()
+        self.deadline = None if time_limit is None else start + time_limit
+        self.node_limit = node_limit
+        self.propagation_limit = propagation_limit
+        
+        try:
+            if engine == "tensor":
+                return self._solve_tensor()
+            if engine == "sat":
+                return self._solve_sat()
+            
+            if not self._propagate():
+                return None
+            
+            result = self._search(restarts)
+        except _BudgetExceeded as e:
+            return SolveTimeout(e.reason, self.get_statistics(), time.perf_counter() - start)
         
         return result
     
-    def _propagate(self) -> bool:
-        self.propagation_calls += 1
+    def _search(self, restarts: bool) -> Optional[Dict[int, Dict[str, str]]]:
+        """Backtracking search from the propagated root, restarting if enabled."""
+        root = self.domains.mark()
+        run = 1
+        while True:
+            self.positions = self.ir.empty_positions()
+            self.failure_count = 0
+            self.restart_limit = self.RESTART_BASE * luby(run) if restarts else None
+            try:
+                if self.explanations is None:
+                    return self._backtrack({})
+                # root pruning needs no decision, it is explained by nothing
+                self.explanations[:] = [0] * len(self.explanations)
+                self.decisions.clear()
+                self.decided.clear()
+                return self._backtrack_explained({})
+            except _Restart:
+                self.domains.undo(root)
+                self.restart_count += 1
+                run += 1
+    
+    def count_solutions(self, limit: Optional[int] = None, time_limit: Optional[float] = None,
+                        node_limit: Optional[int] = None,
+                        propagation_limit: Optional[int] = None) -> Union[int, SolveTimeout]:
+        """
+        Count the solutions of the puzzle, stopping once limit are found
+        (None counts all of them).
+        
+        One depth-first enumeration with the same propagation as solve: after
+        a solution the search backtracks into the remaining values instead of
+        starting again. Like solve, call it on a fresh solver. The budgets work
+        as in solve: when one is hit, a SolveTimeout is returned instead of
+        the count.
+        """
+        if limit is not None and limit < 1:
+            raise ValueError(f"limit must be positive: {limit}")
         
-        changed = True
-        while changed:
-            changed = False
+        start = time.perf_counter()
+        self.deadline = None if time_limit is None else start + time_limit
+        self.node_limit = node_limit
+        self.propagation_limit = propagation_limit
+        
+        try:
+            if not self._propagate():
+                return 0
             
-            # Apply all-different constraint: each value can only appear once per attribute
-            for attr_key in self.attributes.keys():
-                for value in self.attributes[attr_key]:
-                    positions_with_value = []
-                    for houseNr in range(1, self.num_House + 1):
-                        if value in self.domains[houseNr][attr_key]:
-                            positions_with_value.append(houseNr)
-                    
-                    # If value can only go in one position, assign it there
-                    if len(positions_with_value) == 1:
-                        houseNr = positions_with_value[0]
-                        if len(self.domains[houseNr][attr_key]) > 1:
-                            self.domains[houseNr][attr_key] = {value}
-                            changed = True
-                    
-                    # If value has nowhere to go, inconsistency
-                    elif len(positions_with_value) == 0:
-                        return False
+            self.positions = self.ir.empty_positions()
+            count = 0
+            for _ in self._enumerate({}):
+                count += 1
+                if count == limit:
+                    break
+        except _BudgetExceeded as e:
+            return SolveTimeout(e.reason, self.get_statistics(), time.perf_counter() - start)
+        return count
+    
+    def is_unique(self) -> bool:
+        """Whether the puzzle has exactly one solution (stops at the second)."""
+        return self.count_solutions(limit=2) == 1
+    
+    def _enumerate(self, assignment: Dict[int, Dict[str, str]]) -> Iterator[Dict[int, Dict[str, str]]]:
+        """_backtrack that yields every solution (as a copy) and keeps searching."""
+        if self._is_complete(assignment):
+            yield {houseNr: dict(attrs) for houseNr, attrs in assignment.items()}
+            return
+        
+        self.backtrack_count += 1
+        if self.node_limit is not None or self.deadline is not None:
+            self._check_budget(self.backtrack_count, self.propagation_calls)
+        
+        var = self._select_unassigned_variable(assignment)
+        if var is None:
+            return
+        
+        houseNr, attr_key = var
+        var_id = self.domains.var(houseNr, attr_key)
+        attr_idx = self.domains.attr_index[attr_key]
+        
+        for value_idx in self._order_values(var_id, attr_idx):
+            slot = self.ir.slot(attr_idx, value_idx)
+            if self.positions[slot]:
+                continue
             
-            # If position has only one value for an attribute, remove it from other positions
-            for houseNr in range(1, self.num_House + 1):
-                for attr_key in self.attributes.keys():
-                    if len(self.domains[houseNr][attr_key]) == 1:
-                        value = list(self.domains[houseNr][attr_key])[0]
-                        for other_houseNr in range(1, self.num_House + 1):
-                            if other_houseNr != houseNr and value in self.domains[other_houseNr][attr_key]:
-                                self.domains[other_houseNr][attr_key].discard(value)
-                                changed = True
-                                if len(self.domains[other_houseNr][attr_key]) == 0:
-                                    return False
+            if houseNr not in assignment:
+                assignment[houseNr] = {}
+            assignment[houseNr][attr_key] = self.domains.values[attr_idx][value_idx]
+            self.positions[slot] = houseNr
             
-            # Apply unary constraints (constraints with single attributes)
-            for houseNr in range(1, self.num_House + 1):
-                for attr_key in self.attributes.keys():
-                    if len(self.domains[houseNr][attr_key]) == 0:
-                        return False  # Empty domain = inconsistency
-                    
-                    # Remove values that would violate position-specific constraints
-                    values_to_remove = set()
-                    for value in self.domains[houseNr][attr_key]:
-                        test_solution = self._build_partial_solution()
-                        test_solution[houseNr][attr_key] = value
-                        
-                        if not self._is_consistent(test_solution):
-                            values_to_remove.add(value)
-                    
-                    if values_to_remove:
-                        self.domains[houseNr][attr_key] -= values_to_remove
-                        changed = True
-                        if len(self.domains[houseNr][attr_key]) == 0:
-                            return False
+            if self._is_consistent(self.positions, slot):
+                mark = self.domains.mark()
+                self.domains.set_mask(var_id, 1 << value_idx)
+                if self._propagate(mark):
+                    yield from self._enumerate(assignment)
+                self.domains.undo(mark)
             
-            # Apply AC-3 arc consistency
-            if not self._ac3():
+            self.positions[slot] = 0
+            del assignment[houseNr][attr_key]
+            if not assignment[houseNr]:
+                del assignment[houseNr]
+    
+    def _has_budget(self) -> bool:
+        return self.deadline is not None or self.node_limit is not None or self.propagation_limit is not None
+    
+    def _check_budget(self, nodes: int, propagations: int) -> None:
+        """Raise _BudgetExceeded once a limit of the running solve is reached."""
+        if self.node_limit is not None and nodes > self.node_limit:
+            raise _BudgetExceeded("nodes")
+        if self.propagation_limit is not None and propagations > self.propagation_limit:
+            raise _BudgetExceeded("propagations")
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _BudgetExceeded("time")
+    
+    def _solve_tensor(self) -> Optional[Dict[int, Dict[str, str]]]:
+        # imported here so the default engine does not depend on numpy
+        from tensor_engine import TensorEngine
+        
+        check_budget = self._check_budget if self._has_budget() else None
+        tensor_engine = TensorEngine(self.domains, self.ir, check_budget)
+        try:
+            return tensor_engine.solve()
+        finally:
+            self.backtrack_count += tensor_engine.backtrack_count
+            self.propagation_calls += tensor_engine.propagation_calls
+    
+    def _solve_sat(self) -> Optional[Dict[int, Dict[str, str]]]:
+        from sat_engine import SatEngine
+        
+        check_budget = self._check_budget if self._has_budget() else None
+        sat_engine = SatEngine(self.domains, self.ir, check_budget)
+        try:
+            return sat_engine.solve()
+        finally:
+            # decisions are the search nodes, unit propagation rounds the propagation calls
+            self.backtrack_count += sat_engine.sat.decisions
+            self.propagation_calls += sat_engine.sat.propagations
+            self.conflict_count += sat_engine.sat.conflicts
+    
+    def _propagate(self, since_mark: Optional[int] = None) -> bool:
+        """
+        Propagate all-different (the matching-based AllDifferent, per
+        attribute) and the puzzle constraints to a fixpoint.
+        
+        since_mark is the trail mark taken before the latest decision; only
+        constraints watching values removed after it are revisited. None means
+        every constraint is run (initial propagation).
+        """
+        self.propagation_calls += 1
+        if self.propagation_limit is not None or self.deadline is not None:
+            self._check_budget(self.backtrack_count, self.propagation_calls)
+        
+        num_attributes = self.domains.num_attributes
+        if since_mark is None:
+            pending = set(range(num_attributes))
+        else:
+            pending = self._changed_attributes(since_mark)
+        
+        while pending:
+            # all-different reaches its fixpoint in one call per attribute, so it
+            # only runs again on attributes the constraint propagators pruned
+            all_different_mark = self.domains.mark()
+            for attr_idx in sorted(pending):
+                if not self.all_different.propagate(attr_idx):
+                    return self._fail_all_different(attr_idx)
+            
+            if self.explanations is not None:
+                self._explain_removals(all_different_mark)
+            
+            # Apply the constraint propagators until none of them prunes anything
+            mark = self.domains.mark()
+            if not self._ac3(since_mark):
                 return False
+            pending = self._changed_attributes(mark)
+            since_mark = self.domains.mark()
         
         return True
     
-    def _ac3(self) -> bool:
+    def _changed_attributes(self, since_mark: int) -> set:
+        """Attributes with a domain change after the trail mark."""
+        num_attributes = self.domains.num_attributes
+        return {var % num_attributes for var, _ in self.domains.trail[since_mark:]}
+    
+    def _ac3(self, since_mark: Optional[int] = None) -> bool:
         """
-        Optimized AC-3 Algorithm with Lazy Arc Creation.
+        Constraint-scoped AC-3 over the puzzle constraints.
         
-        Instead of creating all arcs upfront (6 * num_attributes * 6 * num_attributes = expensive),
-        only create arcs for attribute pairs that interact based on constraints.
+        Each IR record prunes the domains directly through its propagator
+        (house bitmasks of the values it mentions). The work queue holds
+        constraint indices; when a propagator removes a value from a domain, only
+        the constraints in the neighbour index for that (attribute, value) pair
+        are queued again.
         
-        An arc from variable Xi to variable Xj is consistent if for every value in Xi's domain,
-        there exists a value in Xj's domain that satisfies the constraint between them.
+        Every propagator run is counted in revision_count. Returns False as soon
+        as a propagator reports that its constraint can no longer be satisfied.
         """
-        # Build initial queue with only relevant arcs based on constraints
-        queue = self._get_initial_arcs()
-        queue_set = set(queue)  # For O(1) membership testing
+        queued = [False] * self.ir.count
+        queue = self._get_initial_arcs(since_mark, queued)
         
         while queue:
-            arc = queue.pop(0)
-            queue_set.discard(arc)
-            (houseNr_i, attr_key_i), (houseNr_j, attr_key_j) = arc
+            constraint_idx = queue.popleft()
+            queued[constraint_idx] = False
             
-            # Revise the domain of variable Xi
-            if self._revise(houseNr_i, attr_key_i, houseNr_j, attr_key_j):
-                # If domain of Xi became empty, no solution exists
-                if len(self.domains[houseNr_i][attr_key_i]) == 0:
-                    return False
-                
-                # If the domain of Xi was reduced, re-add all arcs pointing to Xi
-                # (except the arc we just processed)
-                for houseNr_k in range(1, self.num_House + 1):
-                    for attr_key_k in self.attributes.keys():
-                        if (houseNr_k, attr_key_k) != (houseNr_i, attr_key_i) and \
-                           (houseNr_k, attr_key_k) != (houseNr_j, attr_key_j):
-                            reverse_arc = ((houseNr_k, attr_key_k), (houseNr_i, attr_key_i))
-                            if reverse_arc not in queue_set:
-                                queue.append(reverse_arc)
-                                queue_set.add(reverse_arc)
+            self.revision_count += 1
+            mark = self.domains.mark()
+            if not self.ir.propagate(constraint_idx, self.domains):
+                self._bump_weight(constraint_idx)
+                if self.explanations is not None:
+                    self.conflict = self._constraint_explanation(constraint_idx)
+                return False
+            
+            if self.domains.mark() != mark:
+                if self.explanations is not None:
+                    self._explain_removals(mark, self._constraint_explanation(constraint_idx))
+                self._enqueue_neighbours(mark, queue, queued)
         
         return True
     
-    def _get_initial_arcs(self) -> List[Tuple[Tuple[int, str], Tuple[int, str]]]:
-        """
-        Generate only relevant arcs based on constraints.
-        
-        For each constraint, extract the attribute types involved and create arcs
-        between all positions for those attribute types.
-        """
-        relevant_attr_pairs = set()
-        
-        # Extract relevant attribute pairs from constraints
-        for constraint in self.constraints:
-            attr_pair = self._get_constraint_attribute_pair(constraint)
-            if attr_pair:
-                attr_key1, attr_key2 = attr_pair
-                # Add both directions as potential relevant pairs
-                relevant_attr_pairs.add((attr_key1, attr_key2))
-                if attr_key1 != attr_key2:
-                    relevant_attr_pairs.add((attr_key2, attr_key1))
-        
-        # Also add all-different constraints between same attribute
-        for attr_key in self.attributes.keys():
-            relevant_attr_pairs.add((attr_key, attr_key))
-        
-        # Create arcs for relevant attribute pairs
-        arcs = []
-        for attr_key1, attr_key2 in relevant_attr_pairs:
-            for houseNr1 in range(1, self.num_House + 1):
-                for houseNr2 in range(1, self.num_House + 1):
-                    if (houseNr1, attr_key1) != (houseNr2, attr_key2):
-                        arcs.append(((houseNr1, attr_key1), (houseNr2, attr_key2)))
-        
-        return arcs
-    
-    def _get_constraint_attribute_pair(self, constraint: Constraint) -> Optional[Tuple[str, str]]:
+    def _bump_weight(self, constraint_idx: int) -> None:
+        """dom/wdeg: the constraint caused a wipe-out, weigh its values more."""
+        self.weights[constraint_idx] += 1
+        for slot in self.ir.slots_of(constraint_idx):
+            self.slot_weights[slot] += 1
+    
+    # ------------------------------------------------------------------
+    # conflict explanations (backjumping / nogoods)
+    #
+    # explanations[slot] is a bitmask of search depths: the decisions the
+    # removals of that (attribute, value) from any house depend on. A removal
+    # is explained by everything its propagator read, which is what the
+    # constraint mentions (the IR slots of its attributes' values, cf.
+    # Constraint.get_wrong_attributes) or, for all-different, the whole
+    # attribute. Root propagation depends on no decision and stays 0.
+    # ------------------------------------------------------------------
+    
+    def _constraint_explanation(self, constraint_idx: int) -> int:
+        explanation = 0
+        for slot in self.ir.slots_of(constraint_idx):
+            explanation |= self.explanations[slot]
+        return explanation
+    
+    def _attribute_explanation(self, attr_idx: int) -> int:
+        base = attr_idx * self.ir.value_stride
+        explanation = 0
+        for slot in range(base, base + len(self.domains.values[attr_idx])):
+            explanation |= self.explanations[slot]
+        return explanation
+    
+    def _domain_explanation(self, var_id: int, attr_idx: int) -> int:
+        """Decisions behind the values already missing from one domain."""
+        missing = self.domains.full_masks[attr_idx] & ~self.domains.masks[var_id]
+        base = attr_idx * self.ir.value_stride
+        explanation = 0
+        while missing:
+            low = missing & -missing
+            missing ^= low
+            explanation |= self.explanations[base + low.bit_length() - 1]
+        return explanation
+    
+    def _placement_explanation(self, constraint_idx: int) -> int:
+        """Decisions that placed the values of a violated constraint."""
+        explanation = 0
+        for slot in self.ir.slots_of(constraint_idx):
+            if self.positions[slot]:
+                explanation |= 1 << self.placed_depth[slot]
+        return explanation
+    
+    def _explain_removals(self, since_mark: int, cause: Optional[int] = None) -> None:
         """
-        Extract the attribute types involved in a constraint.
+        Add cause to the explanations of the values removed after the trail mark.
         
-        Returns a tuple of (attr_key1, attr_key2) if the constraint involves two attributes,
-        or None if it's a unary constraint.
+        Without a cause every removal is explained by its attribute, as the
+        all-different pass only reads the attribute it prunes.
         """
-        if hasattr(constraint, 'attr1') and hasattr(constraint, 'attr2'):
-            if constraint.attr1 and constraint.attr2:
-                _, attr_key1 = constraint.attr1
-                _, attr_key2 = constraint.attr2
-                return (attr_key1, attr_key2)
-        
-        # Unary constraints (PositionAbsolute, etc.) don't contribute to arc generation
-        return None
+        explanations = self.explanations
+        trail = self.domains.trail
+        masks = self.domains.masks
+        num_attributes = self.domains.num_attributes
+        value_stride = self.ir.value_stride
+        attribute_causes: Dict[int, int] = {}
+        
+        for i in range(since_mark, len(trail)):
+            var, old_mask = trail[i]
+            attr_idx = var % num_attributes
+            reason = cause
+            if reason is None:
+                reason = attribute_causes.get(attr_idx)
+                if reason is None:
+                    reason = attribute_causes[attr_idx] = self._attribute_explanation(attr_idx)
+            
+            removed = old_mask & ~masks[var]
+            base = attr_idx * value_stride
+            while removed:
+                low = removed & -removed
+                removed ^= low
+                explanations[base + low.bit_length() - 1] |= reason
     
-    def _revise(self, houseNr_i: int, attr_key_i: str, houseNr_j: int, attr_key_j: str) -> bool:
+    def _fail_all_different(self, attr_idx: int) -> bool:
+        """Failure of the all-different pass on one attribute; always False."""
+        if self.explanations is not None:
+            self.conflict = self._attribute_explanation(attr_idx)
+        return False
+    
+    def _get_initial_arcs(self, since_mark: Optional[int], queued: List[bool]) -> deque:
         """
-        Revise the domain of variable Xi by removing values that have no support in Xj.
+        Seed the work queue.
         
-        Returns True if the domain of Xi was modified, False otherwise.
+        Without a trail mark every constraint is queued; otherwise only the
+        neighbours of the values removed since that mark.
         """
-        revised = False
-        values_to_remove = set()
-        
-        for value_i in self.domains[houseNr_i][attr_key_i]:
-            # Check if there exists a value in Xj's domain that supports value_i
-            has_support = False
-            
-            for value_j in self.domains[houseNr_j][attr_key_j]:
-                # Create a test assignment
-                test_solution = self._build_partial_solution()
-                test_solution[houseNr_i][attr_key_i] = value_i
-                test_solution[houseNr_j][attr_key_j] = value_j
-                
-                # Check if this pairing is consistent with constraints
-                if self._is_consistent(test_solution):
-                    has_support = True
-                    break
-            
-            # If no supporting value found, remove value_i from domain
-            if not has_support:
-                values_to_remove.add(value_i)
-                revised = True
-        
-        self.domains[houseNr_i][attr_key_i] -= values_to_remove
-        return revised
+        if since_mark is None:
+            for constraint_idx in range(self.ir.count):
+                queued[constraint_idx] = True
+            return deque(range(self.ir.count))
+        
+        queue = deque()
+        self._enqueue_neighbours(since_mark, queue, queued)
+        return queue
+    
+    def _enqueue_neighbours(self, since_mark: int, queue: deque, queued: List[bool]) -> None:
+        """Queue every constraint watching a value removed after the trail mark."""
+        trail = self.domains.trail
+        masks = self.domains.masks
+        num_attributes = self.domains.num_attributes
+        
+        for i in range(since_mark, len(trail)):
+            var, old_mask = trail[i]
+            removed = old_mask & ~masks[var]
+            attr_neighbours = self.neighbours[var % num_attributes]
+            while removed:
+                low = removed & -removed
+                removed ^= low
+                for constraint_idx in attr_neighbours[low.bit_length() - 1]:
+                    if not queued[constraint_idx]:
+                        queued[constraint_idx] = True
+                        queue.append(constraint_idx)
     
     def _backtrack(self, assignment: Dict[int, Dict[str, str]]) -> Optional[Dict[int, Dict[str, str]]]:
 
@@ -232,33 +558,166 @@ class ConstraintSolver:
             return assignment
         
         self.backtrack_count += 1
+        if self.node_limit is not None or self.deadline is not None:
+            self._check_budget(self.backtrack_count, self.propagation_calls)
         
         var = self._select_unassigned_variable(assignment)
         if var is None:
             return None
         
         houseNr, attr_key = var
+        var_id = self.domains.var(houseNr, attr_key)
+        attr_idx = self.domains.attr_index[attr_key]
         
-        for value in list(self.domains[houseNr][attr_key]):
-            new_assignment = copy.deepcopy(assignment)
-            if houseNr not in new_assignment:
-                new_assignment[houseNr] = {}
-            new_assignment[houseNr][attr_key] = value
+        for value_idx in self._order_values(var_id, attr_idx):
+            bit = 1 << value_idx
+            value = self.domains.values[attr_idx][value_idx]
+            slot = self.ir.slot(attr_idx, value_idx)
+            
+            # All-different: the value is already placed in another house
+            if self.positions[slot]:
+                continue
             
-            if self._is_consistent(new_assignment):
-                saved_domains = copy.deepcopy(self.domains)
+            if houseNr not in assignment:
+                assignment[houseNr] = {}
+            assignment[houseNr][attr_key] = value
+            self.positions[slot] = houseNr
+            
+            if self._is_consistent(self.positions, slot):
+                mark = self.domains.mark()
                 
-                self.domains[houseNr][attr_key] = {value}
+                self.domains.set_mask(var_id, bit)
                 
-                if self._propagate():
-                    result = self._backtrack(new_assignment)
+                if self._propagate(mark):
+                    result = self._backtrack(assignment)
                     if result is not None:
                         return result
                 
-                self.domains = saved_domains
+                self.domains.undo(mark)
+            
+            self.failure_count += 1
+            if self.restart_limit is not None and self.failure_count >= self.restart_limit:
+                raise _Restart()
+            
+            self.positions[slot] = 0
+            del assignment[houseNr][attr_key]
+            if not assignment[houseNr]:
+                del assignment[houseNr]
         
         return None
     
+    def _backtrack_explained(self, assignment: Dict[int, Dict[str, str]]) -> Optional[Dict[int, Dict[str, str]]]:
+        """
+        _backtrack with conflict-directed backjumping and nogood learning.
+        
+        Every failure yields a conflict set: the search depths of the decisions
+        it depends on (see _explain_removals). A node's conflict set is the
+        union of its values' failures and the reasons for the values missing
+        from its domain, minus its own depth. On return None, self.conflict
+        holds it. A parent whose decision is not in the conflict set of its
+        child cannot fix the failure by trying another value, so with
+        backjumping on it returns at once and the jump continues upwards.
+        
+        The decisions of a failed node's conflict set are learned as a nogood
+        (when a NogoodStore is set) and checked on every later decision.
+        """
+        if self._is_complete(assignment):
+            return assignment
+        
+        self.backtrack_count += 1
+        if self.node_limit is not None or self.deadline is not None:
+            self._check_budget(self.backtrack_count, self.propagation_calls)
+        
+        depth = len(self.decisions)
+        var = self._select_unassigned_variable(assignment)
+        if var is None:
+            self.conflict = (1 << depth) - 1
+            return None
+        
+        houseNr, attr_key = var
+        var_id = self.domains.var(houseNr, attr_key)
+        attr_idx = self.domains.attr_index[attr_key]
+        
+        depth_bit = 1 << depth
+        conflict = self._domain_explanation(var_id, attr_idx)
+        
+        for value_idx in self._order_values(var_id, attr_idx):
+            bit = 1 << value_idx
+            value = self.domains.values[attr_idx][value_idx]
+            slot = self.ir.slot(attr_idx, value_idx)
+            
+            # All-different: the value is already placed in another house
+            if self.positions[slot]:
+                conflict |= 1 << self.placed_depth[slot]
+                continue
+            
+            if houseNr not in assignment:
+                assignment[houseNr] = {}
+            assignment[houseNr][attr_key] = value
+            self.positions[slot] = houseNr
+            self.placed_depth[slot] = depth
+            decision = (var_id, value_idx)
+            self.decisions.append(decision)
+            self.decided[decision] = depth
+            
+            mark = self.domains.mark()
+            saved_explanations = self.explanations[:]
+            failure = self._decide(var_id, bit, slot, decision, depth_bit, mark)
+            if failure is None:
+                result = self._backtrack_explained(assignment)
+                if result is not None:
+                    return result
+                failure = self.conflict
+            
+            self.domains.undo(mark)
+            self.explanations[:] = saved_explanations
+            del self.decided[decision]
+            self.decisions.pop()
+            self.positions[slot] = 0
+            del assignment[houseNr][attr_key]
+            if not assignment[houseNr]:
+                del assignment[houseNr]
+            
+            if self.backjumping and not failure & depth_bit:
+                # no other value of this variable can repair the failure
+                self.backjump_count += 1
+                self.conflict = failure
+                return None
+            conflict |= failure & ~depth_bit
+            
+            self.failure_count += 1
+            if self.restart_limit is not None and self.failure_count >= self.restart_limit:
+                raise _Restart()
+        
+        if self.nogoods is not None:
+            self.nogoods.add(self.decisions[level] for level in range(depth) if conflict >> level & 1)
+        self.conflict = conflict
+        return None
+    
+    def _decide(self, var_id: int, bit: int, slot: int, decision: Decision, depth_bit: int,
+                mark: int) -> Optional[int]:
+        """
+        Apply a decision already recorded in positions and decisions: check
+        the constraints and the learned nogoods, then propagate. Returns None
+        on success, else the conflict set of the failure.
+        """
+        if not self._is_consistent(self.positions, slot):
+            return self._placement_explanation(self.ir.first_violation_at(slot, self.positions))
+        
+        if self.nogoods is not None:
+            nogood = self.nogoods.match(decision, self.decided)
+            if nogood is not None:
+                conflict = 0
+                for member in nogood:
+                    conflict |= 1 << self.decided[member]
+                return conflict
+        
+        self.domains.set_mask(var_id, bit)
+        self._explain_removals(mark, depth_bit)
+        if not self._propagate(mark):
+            return self.conflict
+        return None
+    
     def _is_complete(self, assignment: Dict[int, Dict[str, str]]) -> bool:
         if len(assignment) != self.num_House:
             return False
@@ -271,24 +730,24 @@ class ConstraintSolver:
         
         return True
     
-    def _is_consistent(self, assignment: Dict[int, Dict[str, str]]) -> bool:
-
-        for attr_key in self.attributes.keys():
-            used_values = []
-            for houseNr in range(1, self.num_House + 1):
-                if houseNr in assignment and attr_key in assignment[houseNr]:
-                    value = assignment[houseNr][attr_key]
-                    if value in used_values:
-                        return False
-                    used_values.append(value)
+    def _is_consistent(self, positions: List[int], slot: int) -> bool:
+        """
+        Evaluate the constraint IR against the reverse position index.
         
-        for constraint in self.constraints:
-            if not constraint.is_valid(assignment):
-                return False
+        Only the records watching slot (the value just placed) are evaluated:
+        every other record already held before the placement, so each check
+        costs O(affected constraints).
         
-        return True
+        All-different is guaranteed by the index itself: _backtrack never
+        places a value that already has a house (positions[slot] is the
+        per-attribute used-value set).
+        """
+        return self.ir.first_violation_at(slot, positions) < 0
     
     def _select_unassigned_variable(self, assignment: Dict[int, Dict[str, str]]) -> Optional[Tuple[int, str]]:
+        if self.variable_order == "domwdeg" or self.rng is not None:
+            return self._select_scored_variable(assignment)
+        
         min_domain_size = float('inf')
         best_var = None
         
@@ -297,7 +756,7 @@ class ConstraintSolver:
                 if houseNr in assignment and attr_key in assignment[houseNr]:
                     continue
                 
-                domain_size = len(self.domains[houseNr][attr_key])
+                domain_size = self.domains.size(houseNr, attr_key)
                 if domain_size == 0:
                     return (houseNr, attr_key)
                 
@@ -307,20 +766,72 @@ class ConstraintSolver:
         
         return best_var
     
-    def _build_partial_solution(self) -> Dict[int, Dict[str, str]]:
-        solution = copy.deepcopy(self.assignment)
+    def _select_scored_variable(self, assignment: Dict[int, Dict[str, str]]) -> Optional[Tuple[int, str]]:
+        """
+        MRV or dom/wdeg with ties collected, broken at random when restarts
+        are on (first in iteration order otherwise).
         
+        The weighted degree of a (house, attribute) cell is the summed weight
+        of the constraints watching the values still in its domain.
+        """
+        masks = self.domains.masks
+        slot_weights = self.slot_weights
+        value_stride = self.ir.value_stride
+        domwdeg = self.variable_order == "domwdeg"
+        
+        best_score = None
+        ties: List[Tuple[int, str]] = []
         for houseNr in range(1, self.num_House + 1):
-            if houseNr not in solution:
-                solution[houseNr] = {}
-            
-            for attr_key in self.attributes.keys():
-                if len(self.domains[houseNr][attr_key]) == 1:
-                    value = list(self.domains[houseNr][attr_key])[0]
-                    if attr_key not in solution[houseNr]:
-                        solution[houseNr][attr_key] = value
+            for attr_idx, attr_key in enumerate(self.domains.attr_keys):
+                if houseNr in assignment and attr_key in assignment[houseNr]:
+                    continue
+                
+                mask = masks[self.domains.var(houseNr, attr_key)]
+                if mask == 0:
+                    return (houseNr, attr_key)
+                
+                score = mask.bit_count()
+                if domwdeg:
+                    weight = 0
+                    remaining = mask
+                    while remaining:
+                        low = remaining & -remaining
+                        remaining ^= low
+                        weight += slot_weights[attr_idx * value_stride + low.bit_length() - 1]
+                    score = score / max(weight, 1)
+                
+                if best_score is None or score < best_score:
+                    best_score = score
+                    ties = [(houseNr, attr_key)]
+                elif score == best_score:
+                    ties.append((houseNr, attr_key))
+        
+        if not ties:
+            return None
+        if self.rng is not None:
+            return self.rng.choice(ties)
+        return ties[0]
+    
+    def _order_values(self, var_id: int, attr_idx: int) -> List[int]:
+        """
+        Value indices of a domain in search order.
         
-        return solution
+        "index" keeps the interning order. "lcv" tries first the value that
+        constrains the rest least: the one the fewest other houses can still
+        hold (placing it prunes it there), then the one fewer constraints watch.
+        """
+        values = []
+        remaining = self.domains.masks[var_id]
+        while remaining:
+            bit = remaining & -remaining
+            remaining ^= bit
+            values.append(bit.bit_length() - 1)
+        
+        if self.value_order == "lcv":
+            watchers = self.ir.watchers
+            values.sort(key=lambda value_idx: (self.domains.houses_of(attr_idx, value_idx).bit_count(),
+                                               len(watchers[self.ir.slot(attr_idx, value_idx)])))
+        return values
     
     def print_solution(self, solution: Dict[int, Dict[str, str]]) -> None:
         if solution is None:
@@ -336,7 +847,8 @@ class ConstraintSolver:
     def print_domains(self) -> None:
         """Print current domains for debugging."""
         print("\n=== Current Domains ===")
-        for pos in sorted(self.domains.keys()):
+        domains = self.domains.as_dict()
+        for pos in sorted(domains.keys()):
             print(f"\nPosition {pos}:")
-            for attr_key, values in sorted(self.domains[pos].items()):
+            for attr_key, values in sorted(domains[pos].items()):
                 print(f"  {attr_key}: {values}")
@@ -1,102 +1,81 @@
 import re
+from constraint_ir import record_violated, KIND_TRUE, KIND_FALSE, KIND_OFFSET, KIND_DISTANCE, KIND_BEFORE, KIND_AT, KIND_NOT_AT
+from puzzle_schema import PuzzleSchema
 
 class Constraint():
 
     def get_info(self):
         raise NotImplementedError()
 
-    def _replace_edgecases(self, text:str):
-        if text.endswith("ing"):
-            text = text[:-3]
-        if text.endswith("s"):
-            text = text[:-1]
-        if text == "swede":
-            text = text[:-1]
-        if text == "ford f150":
-            text = "ford f 150"
-        return text
-
-
-    def __init__(self, attributes: dict, clue: str):
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
         self.attributes = attributes
         self.clue = clue
-        pass
+        # parse context shared by all constraints of the puzzle (key regexes, normalized values, value matcher)
+        self.schema = schema if schema is not None else PuzzleSchema.for_attributes(attributes)
 
     def _extract_attribute_from_text(self, text):
-        # Sort by length descending to match longer values first (e.g., "super tall" before "tall")
-        best_match = None
-        best_length = 0
-        
-        for key in self.attributes.keys():
-            for value in self.attributes[key]:
-                value_modified = self._replace_edgecases(value)
-                if value_modified in text and len(value_modified) > best_length:
-                    best_match = (value, key)
-                    best_length = len(value_modified)
-        
-        return best_match
+        # longest value wins (e.g., "super tall" before "tall")
+        return self.schema.extract(text)
     
     def _extract_attribute_from_text_with_key(self, key, text):
-        # Sort by length descending to match longer values first
-        best_match = None
-        best_length = 0
-        
-        for value in self.attributes[key]:
-            value_modified = self._replace_edgecases(value)
-            if value_modified in text and len(value_modified) > best_length:
-                best_match = (value, key)
-                best_length = len(value_modified)
-        
-        return best_match
+        return self.schema.extract_with_key(key, text)
     
-    def is_valid(self, attributes):
-        raise NotImplementedError()
-    
-    def get_wrong_attributes(self, attributes):
-        raise NotImplementedError()
-    
-    def _get_position_by_attribute(self, attr_value, attr_key, currentSolution):
+    def is_valid(self, currentSolution):
+        """Check a (partial) {houseNr: {key: value}} solution; see check_positions."""
+        return self.check_positions(self._build_position_index(currentSolution))
+
+    def check_positions(self, positions):
+        """
+        Evaluate the constraint against a reverse position index.
+
+        positions maps (value, key) -> houseNr for every assigned value, so
+        looking up where a value lives is a single dict access; unassigned
+        values are missing and never violate the constraint. The verdict is
+        that of the constraint's get_ir() record (constraint_ir.record_violated),
+        the same semantics the solver compiles.
+        """
+        kind, attr1, attr2, param = self.get_ir()
+        return not record_violated(kind, param, positions.get(attr1, 0), positions.get(attr2, 0))
+
+    def get_wrong_attributes(self, currentSolution):
+        """
+        Return the (value, key) pairs of a violated constraint, [] if it holds.
+
+        Goes through check_positions on the position index of the solution.
+        Constraints that could not be parsed report nothing.
+        """
+        if self.get_ir()[0] in (KIND_TRUE, KIND_FALSE):
+            return []
+        if self.check_positions(self._build_position_index(currentSolution)):
+            return []
+        return [attr for attr in (self.attr1, getattr(self, "attr2", None)) if attr]
+
+    def _build_position_index(self, currentSolution):
+        """(value, key) -> houseNr for every assigned value."""
+        positions = {}
         for pos, attrs in currentSolution.items():
-            if attrs.get(attr_key) == attr_value:
-                return pos
-        return None
-    
+            for attr_key, attr_value in attrs.items():
+                positions.setdefault((attr_value, attr_key), pos)
+        return positions
+
+    def get_ir(self):
+        """
+        Lower the constraint to a flat record for ConstraintIR.
+
+        Returns (kind, attr1, attr2, param) where attr1/attr2 are (value, key)
+        pairs (or None) and kind is one of the constraint_ir KIND_* codes.
+        """
+        raise NotImplementedError()
+
 class IdentityConstrain(Constraint):
 
     def get_info(self):
         return f"IdentityConstrain:  {self.clue}\nattr1:{self.attr1}\nattr2:{self.attr2}\nattributes:{self.attributes}\n"
 
-    def is_valid(self, currentSolution):
+    def get_ir(self):
         if not self.attr1 or not self.attr2:
-            return True
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        # If one is assigned and the other is not, it's still potentially valid
-        if pos1 is None or pos2 is None:
-            return True
-        
-        return pos1 == pos2
-    
-    def get_wrong_attributes(self, currentSolution):
-        if not self.attr1 or not self.attr2:
-            return []
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        # If both are assigned to different positions, both are wrong
-        if pos1 is not None and pos2 is not None and pos1 != pos2:
-            return [(attr1_val, attr1_key), (attr2_val, attr2_key)]
-        
-        return []
+            return (KIND_TRUE, None, None, 0)
+        return (KIND_OFFSET, self.attr1, self.attr2, 0)
 
     def _parse_attributes(self):
         parts = self.clue.split(" is ")
@@ -128,11 +107,9 @@ class IdentityConstrain(Constraint):
             if not self.attr1:
                 self.attr1 = self._extract_attribute_from_text(parts[1])
             
-            for key in self.attributes.keys():
-                # Option 1: Use regex word boundaries
-                if re.search(rf"\b{re.escape(key)}\b", parts[2], re.IGNORECASE):
-                    self.attr2 = self._extract_attribute_from_text_with_key(key, parts[2])
-                    break
+            key = self.schema.find_key(parts[2])
+            if key is not None:
+                self.attr2 = self._extract_attribute_from_text_with_key(key, parts[2])
 
             if not self.attr2:
                 self.attr2 = self._extract_attribute_from_text(parts[2])
@@ -145,10 +122,9 @@ class IdentityConstrain(Constraint):
                 self.attr1 = self._extract_attribute_from_text(parts[0])
             
             # Check for attribute keys first in parts[1]
-            for key in self.attributes.keys():
-                if re.search(rf"\b{re.escape(key)}\b", parts[1], re.IGNORECASE):
-                    self.attr2 = self._extract_attribute_from_text_with_key(key, parts[1])
-                    break
+            key = self.schema.find_key(parts[1])
+            if key is not None:
+                self.attr2 = self._extract_attribute_from_text_with_key(key, parts[1])
             
             if not self.attr2:
                 self.attr2 = self._extract_attribute_from_text(parts[1])
@@ -156,8 +132,8 @@ class IdentityConstrain(Constraint):
             pass
         
 
-    def __init__(self, attributes: dict, clue: str):
-        super().__init__(attributes, clue)
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
+        super().__init__(attributes, clue, schema)
         self.attr1:tuple = None
         self.attr2:tuple = None
         self._parse_attributes()
@@ -167,60 +143,33 @@ class NextToConstrain(Constraint):
     def get_info(self):
         return f"NextToConstrain: {self.clue}\nattr1:{self.attr1}\nattr2:{self.attr2}\nattributes:{self.attributes}\n"
 
-    def is_valid(self, currentSolution):
-        if not self.attr1 or not self.attr2:
-            return False
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is None or pos2 is None:
-            return True
-        
-        return abs(pos1 - pos2) == 1
-    
-    def get_wrong_attributes(self, currentSolution):
+    def get_ir(self):
         if not self.attr1 or not self.attr2:
-            return []
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is not None and pos2 is not None and abs(pos1 - pos2) != 1:
-            return [(attr1_val, attr1_key), (attr2_val, attr2_key)]
-        
-        return []
+            return (KIND_FALSE, None, None, 0)
+        return (KIND_DISTANCE, self.attr1, self.attr2, 1)
 
     def _parse_attributes(self):
         parts = self.clue.split(" and ")
         
         if len(parts) >= 2:
-            for key in self.attributes.keys():
-                if re.search(rf"\b{re.escape(key)}\b", parts[0], re.IGNORECASE):
-                    self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
-                    break
+            key = self.schema.find_key(parts[0])
+            if key is not None:
+                self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
             if not self.attr1:
                 self.attr1 = self._extract_attribute_from_text(parts[0])
             second_part = parts[1]
             if " are next to each other" in second_part:
                 second_part = second_part.replace(" are next to each other", "")
             
-            for key in self.attributes.keys():
-                if re.search(rf"\b{re.escape(key)}\b", second_part, re.IGNORECASE):
-                    self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
-                    break
+            key = self.schema.find_key(second_part)
+            if key is not None:
+                self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
             if not self.attr2:
                 self.attr2 = self._extract_attribute_from_text(second_part)
 
 
-    def __init__(self, attributes: dict, clue: str):
-        super().__init__(attributes, clue)
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
+        super().__init__(attributes, clue, schema)
         self.attr1:tuple = None
         self.attr2:tuple = None
         self._parse_attributes()
@@ -229,36 +178,11 @@ class DistanceConstrain(Constraint):
     def get_info(self):
         return f"DistanceConstrain: {self.clue}\ndistance:{self.distance}\nattr1:{self.attr1}\nattr2:{self.attr2}\nattributes:{self.attributes}\n"
     
-    def is_valid(self, currentSolution):
-        if not self.attr1 or not self.attr2:
-            return False
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is None or pos2 is None:
-            return True
-        
-        return abs(pos1 - pos2) == self.distance + 1
-    
-    def get_wrong_attributes(self, currentSolution):
+    def get_ir(self):
         if not self.attr1 or not self.attr2:
-            return []
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is not None and pos2 is not None and abs(pos1 - pos2) != self.distance + 1:
-            return [(attr1_val, attr1_key), (attr2_val, attr2_key)]
-        
-        return []
-    
+            return (KIND_FALSE, None, None, 0)
+        return (KIND_DISTANCE, self.attr1, self.attr2, self.distance + 1)
+
     def _parse_attributes(self):
         distance_words = {
             "one": 1,
@@ -287,24 +211,22 @@ class DistanceConstrain(Constraint):
             
             if len(parts) >= 2:
 
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", parts[0], re.IGNORECASE):
-                        self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
-                        break
+                key = self.schema.find_key(parts[0])
+                if key is not None:
+                    self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
                 if not self.attr1:
                     self.attr1 = self._extract_attribute_from_text(parts[0])
                 
                 second_part = parts[1].rstrip(".")
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", second_part, re.IGNORECASE):
-                        self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
-                        break
+                key = self.schema.find_key(second_part)
+                if key is not None:
+                    self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
                 if not self.attr2:
                     self.attr2 = self._extract_attribute_from_text(second_part)
 
 
-    def __init__(self, attributes: dict, clue: str):
-        super().__init__(attributes, clue)
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
+        super().__init__(attributes, clue, schema)
         self.attr1:tuple = None
         self.attr2:tuple = None
         self.distance = 1
@@ -315,59 +237,32 @@ class LeftConstrain(Constraint):
     def get_info(self):
         return f"LeftConstrain: {self.clue}\nattr1:{self.attr1}\nattr2:{self.attr2}\nattributes:{self.attributes}\n"
     
-    def is_valid(self, currentSolution):
-        if not self.attr1 or not self.attr2:
-            return False
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is None or pos2 is None:
-            return True
-        
-        return pos1 < pos2
-    
-    def get_wrong_attributes(self, currentSolution):
+    def get_ir(self):
         if not self.attr1 or not self.attr2:
-            return []
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is not None and pos2 is not None and pos1 >= pos2:
-            return [(attr1_val, attr1_key), (attr2_val, attr2_key)]
-        
-        return []
-    
+            return (KIND_FALSE, None, None, 0)
+        return (KIND_BEFORE, self.attr1, self.attr2, 0)
+
     def _parse_attributes(self):
         if " is somewhere to the left of " in self.clue:
             parts = self.clue.split(" is somewhere to the left of ")
             
             if len(parts) == 2:
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", parts[0], re.IGNORECASE):
-                        self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
-                        break
+                key = self.schema.find_key(parts[0])
+                if key is not None:
+                    self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
                 if not self.attr1:
                     self.attr1 = self._extract_attribute_from_text(parts[0])
                 
                 second_part = parts[1].rstrip(".")
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", second_part, re.IGNORECASE):
-                        self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
-                        break
+                key = self.schema.find_key(second_part)
+                if key is not None:
+                    self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
                 if not self.attr2:
                     self.attr2 = self._extract_attribute_from_text(second_part)
 
 
-    def __init__(self, attributes: dict, clue: str):
-        super().__init__(attributes, clue)
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
+        super().__init__(attributes, clue, schema)
         self.attr1:tuple = None
         self.attr2:tuple = None
         self._parse_attributes()
@@ -377,36 +272,12 @@ class RightConstrain(Constraint):
     def get_info(self):
         return f"RightConstrain: {self.clue}\nattr1:{self.attr1}\nattr2:{self.attr2}\nattributes:{self.attributes}\n"
     
-    def is_valid(self, currentSolution):
-        if not self.attr1 or not self.attr2:
-            return False
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is None or pos2 is None:
-            return True
-        
-        return pos1 > pos2
-    
-    def get_wrong_attributes(self, currentSolution):
+    def get_ir(self):
         if not self.attr1 or not self.attr2:
-            return []
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is not None and pos2 is not None and pos1 <= pos2:
-            return [(attr1_val, attr1_key), (attr2_val, attr2_key)]
-        
-        return []
-    
+            return (KIND_FALSE, None, None, 0)
+        # attr2 is somewhere to the left of attr1
+        return (KIND_BEFORE, self.attr2, self.attr1, 0)
+
     def _parse_attributes(self):
         if " is somewhere to the right of " in self.clue:
             parts = self.clue.split(" is somewhere to the right of ")
@@ -414,24 +285,22 @@ class RightConstrain(Constraint):
             if len(parts) != 2:
                 return
 
-            for key in self.attributes.keys():
-                if re.search(rf"\b{re.escape(key)}\b", parts[0], re.IGNORECASE):
-                    self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
-                    break
+            key = self.schema.find_key(parts[0])
+            if key is not None:
+                self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
             if not self.attr1:
                 self.attr1 = self._extract_attribute_from_text(parts[0])
                     
             second_part = parts[1].rstrip(".")
-            for key in self.attributes.keys():
-                if re.search(rf"\b{re.escape(key)}\b", second_part, re.IGNORECASE):
-                    self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
-                    break
+            key = self.schema.find_key(second_part)
+            if key is not None:
+                self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
             if not self.attr2:
                 self.attr2 = self._extract_attribute_from_text(second_part)
 
 
-    def __init__(self, attributes: dict, clue: str):
-        super().__init__(attributes, clue)
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
+        super().__init__(attributes, clue, schema)
         self.attr1:tuple = None
         self.attr2:tuple = None
         self._parse_attributes()
@@ -441,58 +310,31 @@ class DirectLeftConstrain(Constraint):
     def get_info(self):
         return f"DirectLeftConstrain: {self.clue}\nattr1:{self.attr1}\nattr2:{self.attr2}\nattributes:{self.attributes}\n"
     
-    def is_valid(self, currentSolution):
-        if not self.attr1 or not self.attr2:
-            return False
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is None or pos2 is None:
-            return True
-        
-        return pos2 - pos1 == 1
-    
-    def get_wrong_attributes(self, currentSolution):
+    def get_ir(self):
         if not self.attr1 or not self.attr2:
-            return []
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is not None and pos2 is not None and pos2 - pos1 != 1:
-            return [(attr1_val, attr1_key), (attr2_val, attr2_key)]
-        
-        return []
-    
+            return (KIND_FALSE, None, None, 0)
+        return (KIND_OFFSET, self.attr1, self.attr2, 1)
+
     def _parse_attributes(self):
         if " is directly left of " in self.clue:
             parts = self.clue.split(" is directly left of ")
             
             if len(parts) == 2:
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", parts[0], re.IGNORECASE):
-                        self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
-                        break
+                key = self.schema.find_key(parts[0])
+                if key is not None:
+                    self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
                 if not self.attr1:
                     self.attr1 = self._extract_attribute_from_text(parts[0])
                 second_part = parts[1].rstrip(".")
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", second_part, re.IGNORECASE):
-                        self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
-                        break
+                key = self.schema.find_key(second_part)
+                if key is not None:
+                    self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
                 if not self.attr2:
                     self.attr2 = self._extract_attribute_from_text(second_part)
 
 
-    def __init__(self, attributes: dict, clue: str):
-        super().__init__(attributes, clue)
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
+        super().__init__(attributes, clue, schema)
         self.attr1:tuple = None
         self.attr2:tuple = None
         self._parse_attributes()
@@ -502,58 +344,32 @@ class DirectRightConstrain(Constraint):
     def get_info(self):
         return f"DirectRightConstrain: {self.clue}\nattr1:{self.attr1}\nattr2:{self.attr2}\nattributes:{self.attributes}\n"
     
-    def is_valid(self, currentSolution):
+    def get_ir(self):
         if not self.attr1 or not self.attr2:
-            return False
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is None or pos2 is None:
-            return True
-        
-        return pos1 - pos2 == 1
-    
-    def get_wrong_attributes(self, currentSolution):
-        if not self.attr1 or not self.attr2:
-            return []
-        
-        attr1_val, attr1_key = self.attr1
-        attr2_val, attr2_key = self.attr2
-        
-        pos1 = self._get_position_by_attribute(attr1_val, attr1_key, currentSolution)
-        pos2 = self._get_position_by_attribute(attr2_val, attr2_key, currentSolution)
-        
-        if pos1 is not None and pos2 is not None and pos1 - pos2 != 1:
-            return [(attr1_val, attr1_key), (attr2_val, attr2_key)]
-        
-        return []
-    
+            return (KIND_FALSE, None, None, 0)
+        # attr2 is directly left of attr1
+        return (KIND_OFFSET, self.attr2, self.attr1, 1)
+
     def _parse_attributes(self):
         if " is directly right of " in self.clue:
             parts = self.clue.split(" is directly right of ")
             
             if len(parts) == 2:
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", parts[0], re.IGNORECASE):
-                        self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
-                        break
+                key = self.schema.find_key(parts[0])
+                if key is not None:
+                    self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
                 if not self.attr1:
                     self.attr1 = self._extract_attribute_from_text(parts[0])
                 second_part = parts[1].rstrip(".")
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", second_part, re.IGNORECASE):
-                        self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
-                        break
+                key = self.schema.find_key(second_part)
+                if key is not None:
+                    self.attr2 = self._extract_attribute_from_text_with_key(key, second_part)
                 if not self.attr2:
                     self.attr2 = self._extract_attribute_from_text(second_part)
 
 
-    def __init__(self, attributes: dict, clue: str):
-        super().__init__(attributes, clue)
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
+        super().__init__(attributes, clue, schema)
         self.attr1:tuple = None
         self.attr2:tuple = None
         self._parse_attributes()
@@ -563,30 +379,11 @@ class PositionAbsoluteConstrain(Constraint):
     def get_info(self):
         return f"PositionAbsoluteConstrain: {self.clue}\nPosition:{self.pos}\nattr1:{self.attr1}\nattributes:{self.attributes}\n"
     
-    def is_valid(self, currentSolution):
-        if not self.attr1 or self.pos is None:
-            return False
-        
-        attr_val, attr_key = self.attr1
-        pos = self._get_position_by_attribute(attr_val, attr_key, currentSolution)
-        
-        if pos is None:
-            return True
-        
-        return pos == self.pos
-    
-    def get_wrong_attributes(self, currentSolution):
+    def get_ir(self):
         if not self.attr1 or self.pos is None:
-            return []
-        
-        attr_val, attr_key = self.attr1
-        pos = self._get_position_by_attribute(attr_val, attr_key, currentSolution)
-        
-        if pos is not None and pos != self.pos:
-            return [(attr_val, attr_key)]
-        
-        return []
-    
+            return (KIND_FALSE, None, None, 0)
+        return (KIND_AT, self.attr1, None, self.pos)
+
     def _parse_attributes(self):
         position_words = {
             "first": 1,
@@ -613,16 +410,15 @@ class PositionAbsoluteConstrain(Constraint):
             parts = self.clue.split(" is in the ")
             
             if len(parts) >= 1:
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", parts[0], re.IGNORECASE):
-                        self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
-                        break
+                key = self.schema.find_key(parts[0])
+                if key is not None:
+                    self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
                 if not self.attr1:
                     self.attr1 = self._extract_attribute_from_text(parts[0])
 
 
-    def __init__(self, attributes: dict, clue: str):
-        super().__init__(attributes, clue)
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
+        super().__init__(attributes, clue, schema)
         self.attr1:tuple = None
         self.pos = None
         self._parse_attributes()
@@ -632,30 +428,11 @@ class PositionAbsoluteNegativeConstrain(Constraint):
     def get_info(self):
         return f"PositionAbsoluteNegativeConstrain: {self.clue}\nPosition:{self.pos}\nattr1:{self.attr1}\nattributes:{self.attributes}\n"
     
-    def is_valid(self, currentSolution):
+    def get_ir(self):
         if not self.attr1 or self.pos is None:
-            return False
-        
-        attr_val, attr_key = self.attr1
-        pos = self._get_position_by_attribute(attr_val, attr_key, currentSolution)
-        
-        if pos is None:
-            return True
-        
-        return pos != self.pos
-    
-    def get_wrong_attributes(self, currentSolution):
-        if not self.attr1 or self.pos is None:
-            return []
-        
-        attr_val, attr_key = self.attr1
-        pos = self._get_position_by_attribute(attr_val, attr_key, currentSolution)
-        
-        if pos is not None and pos == self.pos:
-            return [(attr_val, attr_key)]
-        
-        return []
-    
+            return (KIND_FALSE, None, None, 0)
+        return (KIND_NOT_AT, self.attr1, None, self.pos)
+
     def _parse_attributes(self):
         position_words = {
             "first": 1,
@@ -682,15 +459,14 @@ class PositionAbsoluteNegativeConstrain(Constraint):
             parts = self.clue.split(" is not in the ")
             
             if len(parts) >= 1:
-                for key in self.attributes.keys():
-                    if re.search(rf"\b{re.escape(key)}\b", parts[0], re.IGNORECASE):
-                        self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
-                        break
+                key = self.schema.find_key(parts[0])
+                if key is not None:
+                    self.attr1 = self._extract_attribute_from_text_with_key(key, parts[0])
                 if not self.attr1:
                     self.attr1 = self._extract_attribute_from_text(parts[0])
 
-    def __init__(self, attributes: dict, clue: str):
-        super().__init__(attributes, clue)
+    def __init__(self, attributes: dict, clue: str, schema: PuzzleSchema = None):
+        super().__init__(attributes, clue, schema)
         self.attr1:tuple = None
         self.pos = None
         self._parse_attributes()
\ No newline at end of file
@@ -0,0 +1,127 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+
+def _column_keys(solution: Dict, truth_columns: List[set]) -> List[Optional[str]]:
+    """
+    Map every ground-truth column to the attribute key of our solution.
+
+    The header names of the reference ("BookGenre", ...) do not match the keys
+    PreProcess extracts ("book", ...), so columns are matched by their value
+    set instead: the key whose values over all houses equal the column's values.
+    """
+    key_values = defaultdict(set)
+    for attrs in solution.values():
+        for attr_key, value in attrs.items():
+            key_values[attr_key].add(value)
+
+    keys = []
+    for column in truth_columns:
+        match = None
+        for attr_key, values in key_values.items():
+            if values == column:
+                match = attr_key
+                break
+        keys.append(match)
+    return keys
+
+
+def score_solution(solution: Optional[Dict], truth: Dict) -> Tuple[int, int, int]:
+    """
+    Score a solved grid cell by cell against a Gridmode reference solution.
+
+    truth is the parquet's solution field ({"header": [...], "rows": [...]}, the
+    first column being the house number). Returns (correct_cells, total_cells,
+    unmatched_cells); a missing solution scores 0 correct cells. Cells of a
+    column no attribute key could be mapped to count as wrong and are also
+    reported as unmatched.
+    """
+    rows = [[str(cell).lower() for cell in row] for row in truth["rows"]]
+    total_cells = sum(len(row) - 1 for row in rows)
+    if not solution:
+        return 0, total_cells, 0
+
+    # JSON round trips turn the house numbers into strings
+    solution = {int(houseNr): attrs for houseNr, attrs in solution.items()}
+    truth_columns = [{row[j] for row in rows} for j in range(1, len(rows[0]))]
+    keys = _column_keys(solution, truth_columns)
+
+    correct_cells = 0
+    for row in rows:
+        attrs = solution.get(int(row[0]), {})
+        for attr_key, value in zip(keys, row[1:]):
+            if attr_key is not None:
+                correct_cells += attrs.get(attr_key) == value
+    unmatched_cells = len(rows) * keys.count(None)
+    return correct_cells, total_cells, unmatched_cells
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def evaluate(records: List[Dict], gridmode) -> Dict:
+    """
+    Aggregate accuracy and latency of result records against the ground truth.
+
+    records are the result lines of the batch driver (idx, status, solution,
+    seconds). Accuracy and the cells of unmatched columns are reported per
+    grid size and overall.
+    """
+    by_size = defaultdict(lambda: {"puzzles": 0, "solved": 0, "timeouts": 0, "correct_cells": 0, "total_cells": 0,
+                                   "unmatched_cells": 0, "exact": 0})
+    latencies = []
+
+    for record in records:
+        idx = record["idx"]
+        size = gridmode["size"].iloc[idx]
+        correct_cells, total_cells, unmatched_cells = score_solution(record.get("solution"), gridmode.solution.iloc[idx])
+
+        stats = by_size[size]
+        stats["puzzles"] += 1
+        stats["solved"] += record["status"] == "solved"
+        stats["timeouts"] += record["status"] == "timeout"
+        stats["correct_cells"] += correct_cells
+        stats["total_cells"] += total_cells
+        stats["unmatched_cells"] += unmatched_cells
+        stats["exact"] += correct_cells == total_cells
+        if "seconds" in record:
+            latencies.append(record["seconds"])
+
+    overall = {"puzzles": 0, "solved": 0, "timeouts": 0, "correct_cells": 0, "total_cells": 0,
+               "unmatched_cells": 0, "exact": 0}
+    for stats in by_size.values():
+        for key in overall:
+            overall[key] += stats[key]
+
+    latencies.sort()
+    return {
+        "by_size": dict(by_size),
+        "overall": overall,
+        "latency": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        },
+    }
+
+
+def print_report(report: Dict, wall_time: float, processed: int) -> None:
+    def row(name, stats):
+        accuracy = stats["correct_cells"] / stats["total_cells"] if stats["total_cells"] else 0.0
+        print(f"{name:>8} {stats['puzzles']:>8} {stats['solved']:>8} {stats['timeouts']:>8} {accuracy:>10.2%} {stats['unmatched_cells']:>10} {stats['exact']:>8}")
+
+    print("\n=== Evaluation ===")
+    print(f"{'size':>8} {'puzzles':>8} {'solved':>8} {'timeouts':>8} {'cell acc':>10} {'unmatched':>10} {'exact':>8}")
+    for size in sorted(report["by_size"]):
+        row(size, report["by_size"][size])
+    row("overall", report["overall"])
+
+    latency = report["latency"]
+    print(f"\nLatency p50/p95/p99: {1000 * latency['p50']:.2f} / {1000 * latency['p95']:.2f} / {1000 * latency['p99']:.2f} ms")
+    throughput = processed / wall_time if wall_time > 0 else 0.0
+    print(f"Wall time: {wall_time:.2f}s for {processed} puzzles ({throughput:.1f} puzzles/s)")
@@ -0,0 +1,64 @@
+from collections import OrderedDict, defaultdict
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+# one search decision: (variable id, value index) in BitsetDomains terms
+Decision = Tuple[int, int]
+
+
+class NogoodStore:
+    """
+    Bounded store of the nogoods learned by ConstraintSolver's backjumping search.
+
+    A nogood is a set of decisions that cannot all hold in a solution: the
+    decisions in the conflict set of a failed search node. Nogoods depend only
+    on the puzzle, not on the search path, so they stay valid across branches
+    and restarts.
+
+    Each nogood is indexed under every decision it contains, so match() only
+    looks at the nogoods of the decision just made. When more than max_entries
+    are stored, the least recently used one (learned or last matched) is
+    evicted.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[FrozenSet[Decision], None]" = OrderedDict()
+        self.index: Dict[Decision, Set[FrozenSet[Decision]]] = defaultdict(set)
+
+        self.learned = 0
+        self.hits = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, decisions: Iterable[Decision]) -> None:
+        nogood = frozenset(decisions)
+        if not nogood:
+            return  # the empty nogood means no solution; the search ends anyway
+        if nogood in self.entries:
+            self.entries.move_to_end(nogood)
+            return
+
+        self.entries[nogood] = None
+        for decision in nogood:
+            self.index[decision].add(nogood)
+        self.learned += 1
+
+        while len(self.entries) > self.max_entries:
+            evicted, _ = self.entries.popitem(last=False)
+            for decision in evicted:
+                self.index[decision].discard(evicted)
+            self.evicted += 1
+
+    def match(self, decision: Decision, decided: Dict[Decision, int]) -> Optional[FrozenSet[Decision]]:
+        """
+        Return a stored nogood that contains decision and whose decisions are
+        all in decided (the current decisions, decision included), or None.
+        """
+        for nogood in self.index.get(decision, ()):
+            if all(member in decided for member in nogood):
+                self.entries.move_to_end(nogood)
+                self.hits += 1
+                return nogood
+        return None
@@ -71,4 +71,3 @@ class PreProcess:
         attrs = self.extract_attributes(characteristics_text)
 
         return attrs, clues
-
@@ -0,0 +1,84 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from value_matcher import ValueMatcher
+
+
+def replace_edgecases(text: str) -> str:
+    """Normalize an attribute value to the form it takes inside clues."""
+    if text.endswith("ing"):
+        text = text[:-3]
+    if text.endswith("s"):
+        text = text[:-1]
+    if text == "swede":
+        text = text[:-1]
+    if text == "ford f150":
+        text = "ford f 150"
+    return text
+
+
+# attribute key -> compiled whole-word regex; keys repeat across puzzles
+_key_patterns: Dict[str, re.Pattern] = {}
+
+
+def _key_pattern(key: str) -> re.Pattern:
+    pattern = _key_patterns.get(key)
+    if pattern is None:
+        pattern = re.compile(rf"\b{re.escape(key)}\b", re.IGNORECASE)
+        _key_patterns[key] = pattern
+    return pattern
+
+
+class PuzzleSchema:
+    """
+    Parse context of one puzzle, built once from the attributes returned by
+    PreProcess.proccess and shared by all constraints of the puzzle.
+
+    Holds everything the constraint parsers used to recompute per clue:
+    - normalized_values: attribute key -> values after replace_edgecases
+    - key_patterns: (key, compiled whole-word regex) pairs in attribute order
+    - matcher: the ValueMatcher over the normalized values
+    """
+
+    _cache: Dict[Tuple, "PuzzleSchema"] = {}
+    CACHE_SIZE = 256
+
+    def __init__(self, attributes: Dict[str, List[str]]):
+        self.attributes = attributes
+        self.keys = list(attributes.keys())
+        self.normalized_values = {key: [replace_edgecases(value) for value in values]
+                                  for key, values in attributes.items()}
+
+        self.key_patterns = [(key, _key_pattern(key)) for key in self.keys]
+
+        self.matcher = ValueMatcher(attributes, self.normalized_values)
+
+    @classmethod
+    def for_attributes(cls, attributes: Dict[str, List[str]]) -> "PuzzleSchema":
+        """Cached schema for constraints built without an explicit one."""
+        key = tuple((attr_key, tuple(values)) for attr_key, values in attributes.items())
+        schema = cls._cache.get(key)
+        if schema is None:
+            schema = cls(attributes)
+            if len(cls._cache) >= cls.CACHE_SIZE:
+                cls._cache.clear()
+            cls._cache[key] = schema
+        return schema
+
+    def find_key(self, text: str) -> Optional[str]:
+        """
+        Return the first attribute key (in attribute order) that occurs in text
+        as a whole word, ignoring case, or None.
+        """
+        for key, pattern in self.key_patterns:
+            if pattern.search(text):
+                return key
+        return None
+
+    def extract(self, text: str) -> Optional[Tuple[str, str]]:
+        """(value, key) of the longest value mentioned in text."""
+        return self.matcher.longest(text)
+
+    def extract_with_key(self, key: str, text: str) -> Optional[Tuple[str, str]]:
+        """Like extract, restricted to the values of one attribute."""
+        return self.matcher.longest(text, key)
@@ -0,0 +1,122 @@
+from typing import Callable, Dict, List, Optional
+
+from bitset_domains import BitsetDomains
+from cdcl_solver import CDCLSolver
+from constraint_ir import (ConstraintIR, KIND_FALSE, KIND_OFFSET, KIND_DISTANCE,
+                           KIND_BEFORE, KIND_AT, KIND_NOT_AT)
+
+
+class SatEngine:
+    """
+    CNF encoding of a puzzle for the CDCLSolver, as an engine of ConstraintSolver.
+
+    One-hot encoding: variable x(h, a, v) is true iff house h holds value v of
+    attribute a. Clauses:
+    - exactly one value per (house, attribute) cell and exactly one house per
+      (attribute, value), as an at-least-one clause plus pairwise at-most-one
+    - a unit clause for every value the BitsetDomains already ruled out
+    - per ConstraintIR record, for every house p1 of value 1 the houses p2 of
+      value 2 it allows: x(p1, value 1) -> OR x(p2, value 2), and the same
+      from the other side (AT / NOT_AT are unit clauses)
+    """
+
+    def __init__(self, domains: BitsetDomains, ir: ConstraintIR,
+                 check_budget: Optional[Callable[[int, int], None]] = None):
+        self.domains = domains
+        self.ir = ir
+        self.num_House = domains.num_House
+        self.num_attributes = domains.num_attributes
+        self.num_values = [len(values) for values in domains.values]
+
+        # variable numbers of attribute a start at offsets[a]
+        self.offsets = []
+        num_vars = 0
+        for attr_idx in range(self.num_attributes):
+            self.offsets.append(num_vars + 1)
+            num_vars += self.num_House * self.num_values[attr_idx]
+
+        self.sat = CDCLSolver(num_vars, check_budget)
+        self._encode()
+
+    def x(self, houseNr: int, attr_idx: int, value_idx: int) -> int:
+        return self.offsets[attr_idx] + (houseNr - 1) * self.num_values[attr_idx] + value_idx
+
+    def _exactly_one(self, lits: List[int]) -> None:
+        self.sat.add_clause(lits)
+        for i in range(len(lits)):
+            for j in range(i + 1, len(lits)):
+                self.sat.add_clause([-lits[i], -lits[j]])
+
+    def _encode(self) -> None:
+        houses = range(1, self.num_House + 1)
+
+        for attr_idx in range(self.num_attributes):
+            values = range(self.num_values[attr_idx])
+            for houseNr in houses:
+                self._exactly_one([self.x(houseNr, attr_idx, value_idx) for value_idx in values])
+            for value_idx in values:
+                self._exactly_one([self.x(houseNr, attr_idx, value_idx) for houseNr in houses])
+
+        for var, mask in enumerate(self.domains.masks):
+            house_idx, attr_idx = divmod(var, self.num_attributes)
+            for value_idx in range(self.num_values[attr_idx]):
+                if not mask >> value_idx & 1:
+                    self.sat.add_clause([-self.x(house_idx + 1, attr_idx, value_idx)])
+
+        for idx in range(self.ir.count):
+            self._encode_record(idx)
+
+    def _allowed(self, kind: int, param: int, p1: int) -> List[int]:
+        """Houses p2 of value 2 that satisfy the record if value 1 is in house p1."""
+        houses = range(1, self.num_House + 1)
+        if kind == KIND_OFFSET:
+            return [p2 for p2 in houses if p2 - p1 == param]
+        if kind == KIND_DISTANCE:
+            return [p2 for p2 in houses if abs(p1 - p2) == param]
+        return [p2 for p2 in houses if p1 < p2]  # KIND_BEFORE
+
+    def _encode_record(self, idx: int) -> None:
+        kind, param = self.ir.kind[idx], self.ir.param[idx]
+        if kind == KIND_FALSE:
+            self.sat.add_clause([])
+            return
+        if kind not in (KIND_OFFSET, KIND_DISTANCE, KIND_BEFORE, KIND_AT, KIND_NOT_AT):
+            return  # KIND_TRUE
+
+        attr1, value1 = self.ir.unpack(self.ir.slot1[idx])
+        if kind == KIND_AT:
+            if param > self.num_House:
+                self.sat.add_clause([])
+            else:
+                self.sat.add_clause([self.x(param, attr1, value1)])
+            return
+        if kind == KIND_NOT_AT:
+            if param <= self.num_House:
+                self.sat.add_clause([-self.x(param, attr1, value1)])
+            return
+
+        attr2, value2 = self.ir.unpack(self.ir.slot2[idx])
+        houses = range(1, self.num_House + 1)
+        for p1 in houses:
+            allowed = self._allowed(kind, param, p1)
+            self.sat.add_clause([-self.x(p1, attr1, value1)] + [self.x(p2, attr2, value2) for p2 in allowed])
+        for p2 in houses:
+            allowed = [p1 for p1 in houses if p2 in self._allowed(kind, param, p1)]
+            self.sat.add_clause([-self.x(p2, attr2, value2)] + [self.x(p1, attr1, value1) for p1 in allowed])
+
+    def solve(self) -> Optional[Dict[int, Dict[str, str]]]:
+        model = self.sat.solve()
+        if model is None:
+            return None
+        return self.decode(model)
+
+    def decode(self, model: List[bool]) -> Dict[int, Dict[str, str]]:
+        solution = {}
+        for houseNr in range(1, self.num_House + 1):
+            solution[houseNr] = {}
+            for attr_idx, attr_key in enumerate(self.domains.attr_keys):
+                for value_idx in range(self.num_values[attr_idx]):
+                    if model[self.x(houseNr, attr_idx, value_idx)]:
+                        solution[houseNr][attr_key] = self.domains.values[attr_idx][value_idx]
+                        break
+        return solution
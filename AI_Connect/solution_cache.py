@@ -0,0 +1,115 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from typing import Dict, Optional, Tuple
+
+
+class SolutionCache:
+    """
+    Content-addressed, persistent cache of solved puzzles backed by SQLite.
+
+    Entries are keyed by a hash of the normalized puzzle text plus a version tag
+    (solver version and engine), so a solver change invalidates old entries
+    simply by producing different keys. Puzzles without a solution are cached
+    too (stored as null).
+
+    The cache is bounded to max_entries; the least recently used entries are
+    evicted. Several worker processes can share one file (WAL journal).
+
+    Hits do not write: the last_used touches are kept in memory and written
+    in one batch with the next put, on close, or once TOUCH_EVERY of them
+    are pending. Touches still pending when a process dies are lost, which
+    only makes those entries look a little older to the eviction.
+    """
+
+    EVICT_EVERY = 64
+    TOUCH_EVERY = 256
+
+    def __init__(self, path: str, max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._puts = 0
+        # key -> last_used of the hits not yet written
+        self._touched: Dict[str, float] = {}
+
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, solution TEXT, last_used REAL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)")
+        self.connection.commit()
+
+    @staticmethod
+    def normalize(puzzle_text: str) -> str:
+        return re.sub(r"\s+", " ", puzzle_text.strip().lower())
+
+    @classmethod
+    def make_key(cls, puzzle_text: str, version: str) -> str:
+        return hashlib.sha256(f"{version}\n{cls.normalize(puzzle_text)}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict[int, Dict[str, str]]]]:
+        """Return (hit, solution). solution is None for a cached unsolvable puzzle."""
+        row = self.connection.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+
+        self._touched[key] = time.time()
+        if len(self._touched) >= self.TOUCH_EVERY:
+            self._write_touches()
+            self.connection.commit()
+
+        solution = json.loads(row[0])
+        if solution is None:
+            return True, None
+        # JSON turns the house numbers into strings
+        return True, {int(houseNr): attrs for houseNr, attrs in solution.items()}
+
+    def put(self, key: str, solution: Optional[Dict[int, Dict[str, str]]]) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO solutions (key, solution, last_used) VALUES (?, ?, ?)",
+            (key, json.dumps(solution), time.time()),
+        )
+        self._touched.pop(key, None)
+        self._write_touches()
+        self._puts += 1
+        if self._puts % self.EVICT_EVERY == 0:
+            self.evict()
+        self.connection.commit()
+
+    def _write_touches(self) -> None:
+        """Write the pending last_used touches (the caller commits)."""
+        if self._touched:
+            self.connection.executemany(
+                "UPDATE solutions SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def evict(self) -> None:
+        """Drop the least recently used entries beyond max_entries."""
+        self.connection.execute(
+            "DELETE FROM solutions WHERE key IN "
+            "(SELECT key FROM solutions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def close(self) -> None:
+        self._write_touches()
+        self.connection.commit()
+        self.connection.close()
+
+
+# one open cache per path and process (the batch driver runs solve_puzzle in worker processes)
+_open_caches: Dict[str, SolutionCache] = {}
+
+
+def open_cache(path: str) -> SolutionCache:
+    if path not in _open_caches:
+        _open_caches[path] = SolutionCache(path)
+    return _open_caches[path]
@@ -1,68 +1,422 @@
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
 import pandas as pd
 from preProccesPuzzle import PreProcess
-from clue_classifier import ClueClassifier
+from clue_classifier import classify_many
 from constraints import Constraint, IdentityConstrain, NextToConstrain, DistanceConstrain, RightConstrain, LeftConstrain, DirectRightConstrain, DirectLeftConstrain, PositionAbsoluteConstrain, PositionAbsoluteNegativeConstrain
-from constraint_solver import ConstraintSolver
-from concurrent.futures import ProcessPoolExecutor
+from constraint_solver import ConstraintSolver, SolveTimeout, ENGINES, SOLVER_VERSION, VARIABLE_ORDERS, VALUE_ORDERS
+from puzzle_schema import PuzzleSchema
+from solution_cache import SolutionCache, open_cache
+from evaluation import evaluate, print_report
+from solver_profile import SolverProfile, print_profile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+HOUSES_PATTERN = re.compile(r"there are (\d+) houses", re.IGNORECASE)
+ATTRIBUTE_LINE_PATTERN = re.compile(r"^\s*-\s", re.MULTILINE)
+CLUE_LINE_PATTERN = re.compile(r"^\s*\d+\.\s", re.MULTILINE)
 
 def constraint_factory(attrs, clues):
     constrains: list[Constraint] = []
-    classifier = ClueClassifier()
-    for c in clues:
-        clue, clue_type = classifier.classify(c)
+    # parse context shared by all clues of the puzzle
+    schema = PuzzleSchema(attrs)
+    for clue, clue_type in classify_many(clues):
 
         if clue_type == "IDENTITY":
-            constrains.append(IdentityConstrain(attrs, clue))
+            constrains.append(IdentityConstrain(attrs, clue, schema))
         if clue_type == "NEXT_TO":
-            constrains.append(NextToConstrain(attrs, clue))
+            constrains.append(NextToConstrain(attrs, clue, schema))
         if clue_type == "LEFT":
-            constrains.append(LeftConstrain(attrs, clue))
+            constrains.append(LeftConstrain(attrs, clue, schema))
         if clue_type == "RIGHT":
-            constrains.append(RightConstrain(attrs, clue))
+            constrains.append(RightConstrain(attrs, clue, schema))
         if clue_type == "DISTANCE":
-            constrains.append(DistanceConstrain(attrs, clue))
+            constrains.append(DistanceConstrain(attrs, clue, schema))
         if clue_type == "DIRECT_LEFT":
-            constrains.append(DirectLeftConstrain(attrs, clue))
+            constrains.append(DirectLeftConstrain(attrs, clue, schema))
         if clue_type == "DIRECT_RIGHT":
-            constrains.append(DirectRightConstrain(attrs, clue))
+            constrains.append(DirectRightConstrain(attrs, clue, schema))
         if clue_type == "POSITION_ABSOLUTE":
-            constrains.append(PositionAbsoluteConstrain(attrs, clue))
+            constrains.append(PositionAbsoluteConstrain(attrs, clue, schema))
         if clue_type == "POSITION_ABSOLUTE_NEGATIVE":
-            constrains.append(PositionAbsoluteNegativeConstrain(attrs, clue))
+            constrains.append(PositionAbsoluteNegativeConstrain(attrs, clue, schema))
         if clue_type == "UNKNOWN":
             raise TypeError
     
     return constrains
 
 
-def solve_puzzle(idx, puzzle_text):
-    ppp = PreProcess()
-    attrs, clues = ppp.proccess(puzzle_text)
+# solve() keywords that only bound the search; every other option can change the solution
+BUDGET_OPTIONS = {"time_limit", "node_limit", "propagation_limit"}
+
+
+def solver_tag(engine="bitset", limits=None):
+    """
+    Solver part of the SolutionCache key: version, engine and, in sorted order,
+    the solve options that affect which solution is returned (not the budgets).
+    """
+    options = sorted((name, value) for name, value in (limits or {}).items() if name not in BUDGET_OPTIONS)
+    return "/".join([SOLVER_VERSION, engine] + [f"{name}={value}" for name, value in options])
+
+
+def solve_puzzle(idx, puzzle_text, engine="bitset", cache_path=None, parsed=None, limits=None, profile=None):
+    """
+    Solve one puzzle. With cache_path, the SolutionCache at that path is checked
+    before any parsing or solving, and fresh results are stored in it, keyed
+    by puzzle text and solver_tag.
+    parsed is the (attrs, clues) pair if the text was already preprocessed.
+    limits are keyword arguments for ConstraintSolver.solve: budgets (time_limit, node_limit, propagation_limit)
+    and search options (variable_order, value_order, restarts, seed,
+    backjumping, nogood_limit); a solve that hits a budget returns a
+    SolveTimeout, which is not cached.
+    profile is a SolverProfile to record the solve into.
+    """
+    cache = key = None
+    if cache_path is not None:
+        cache = open_cache(cache_path)
+        key = SolutionCache.make_key(puzzle_text, solver_tag(engine, limits))
+        hit, solution = cache.get(key)
+        if hit:
+            return idx, solution
+
+    if parsed is None:
+        parsed = PreProcess().proccess(puzzle_text)
+    attrs, clues = parsed
     constrains = constraint_factory(attrs, clues)
-    Cs = ConstraintSolver(attrs, constrains)
-    solution = Cs.solve()
+    Cs = ConstraintSolver(attrs, constrains, profile)
+    solution = Cs.solve(engine=engine, **(limits or {}))
+
+    if cache is not None and not isinstance(solution, SolveTimeout):
+        cache.put(key, solution)
     return idx, solution
 
 
-def main():
-    gridmode = pd.read_parquet("Gridmode-00000-of-00001.parquet")
+def count_puzzle(idx, puzzle_text, parsed=None, count_limit=2, limits=None):
+    """
+    Worker entry point of the solution counting mode: count the solutions of
+    one puzzle up to count_limit and return its record. status is "unique",
+    "ambiguous" (more than one solution) or "no_solution"; counts are not cached.
+
+    The budgets in limits (time_limit, node_limit, propagation_limit) bound
+    the count; a puzzle that exceeds one gets status "timeout" like in
+    run_puzzle. The search options in limits do not apply to counting.
+    """
+    start = time.perf_counter()
+    if parsed is None:
+        parsed = PreProcess().proccess(puzzle_text)
+    attrs, clues = parsed
+    budgets = {name: value for name, value in (limits or {}).items() if name in BUDGET_OPTIONS}
+    solutions = ConstraintSolver(attrs, constraint_factory(attrs, clues)).count_solutions(count_limit, **budgets)
+    if isinstance(solutions, SolveTimeout):
+        return {
+            "idx": idx,
+            "status": "timeout",
+            "solutions": None,
+            "seconds": time.perf_counter() - start,
+            "reason": solutions.reason,
+            "statistics": solutions.statistics,
+        }
+    status = "no_solution" if solutions == 0 else "unique" if solutions == 1 else "ambiguous"
+    return {
+        "idx": idx,
+        "status": status,
+        "solutions": solutions,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def run_puzzle(idx, puzzle_text, engine="bitset", cache_path=None, parsed=None, limits=None, profile=False):
+    """
+    Worker entry point: solve one puzzle and return its result record.
+
+    With profile, the record carries the SolverProfile of the solve (as a dict)
+    under "profile"; cache hits are not solved and have none.
+    """
+    solver_profile = SolverProfile() if profile else None
+    start = time.perf_counter()
+    _, solution = solve_puzzle(idx, puzzle_text, engine, cache_path, parsed, limits, solver_profile)
+    if isinstance(solution, SolveTimeout):
+        record = {
+            "idx": idx,
+            "status": "timeout",
+            "solution": None,
+            "seconds": time.perf_counter() - start,
+            "reason": solution.reason,
+            "statistics": solution.statistics,
+        }
+    else:
+        record = {
+            "idx": idx,
+            "status": "solved" if solution is not None else "no_solution",
+            "solution": solution,
+            "seconds": time.perf_counter() - start,
+        }
+    if solver_profile is not None and solver_profile.solves:
+        record["profile"] = solver_profile.as_dict()
+    return record
+
+
+def run_chunk(chunk, engine="bitset", cache_path=None, limits=None, profile=False, count_limit=None):
+    """
+    Worker entry point for a chunk of (idx, puzzle_text, parsed) puzzles.
+
+    With count_limit the puzzles are counted (count_puzzle) instead of solved.
+    Errors are caught per puzzle, so one bad puzzle does not take the rest of
+    its chunk down with it.
+    """
+    records = []
+    for idx, puzzle_text, parsed in chunk:
+        try:
+            if count_limit is not None:
+                records.append(count_puzzle(idx, puzzle_text, parsed, count_limit, limits))
+            else:
+                records.append(run_puzzle(idx, puzzle_text, engine, cache_path, parsed, limits, profile))
+        except Exception as e:
+            records.append({"idx": idx, "status": "error", "solution": None, "error": repr(e)})
+    return records
+
+
+def expected_cost(puzzle_text, parsed=None):
+    """
+    Rough relative solve cost of a puzzle: houses^2 * attributes * clues.
+
+    Fitted to the mean solve times per grid size on the Gridmode set (a 6x6
+    grid costs about 8x a 4x4 one). Without parsed the sizes are estimated
+    from the raw text (house count, " - " attribute lines and numbered clue
+    lines), so scheduling does not need a full PreProcess parse.
+    """
+    if parsed is not None:
+        attrs, clues = parsed
+        if not attrs:
+            return 1
+        num_House = len(next(iter(attrs.values())))
+        return num_House * num_House * len(attrs) * max(1, len(clues))
+
+    houses = HOUSES_PATTERN.search(puzzle_text)
+    characteristics_text, _, clues_text = puzzle_text.lower().partition("## clues")
+    num_attributes = len(ATTRIBUTE_LINE_PATTERN.findall(characteristics_text))
+    if houses is None or not num_attributes:
+        return 1
+    num_House = int(houses.group(1))
+    return num_House * num_House * num_attributes * max(1, len(CLUE_LINE_PATTERN.findall(clues_text)))
+
+
+def make_chunks(puzzles, max_workers, chunks_per_worker=8):
+    """
+    Order puzzles longest-expected-first and pack the cheap ones into chunks.
+
+    Every chunk gets about total_cost / (max_workers * chunks_per_worker) of
+    expected work: expensive puzzles go alone, cheap ones are grouped to
+    amortise the IPC per task. Chunks come out in descending cost order, so
+    the pool starts the large grids first and the tail consists of small
+    chunks that balance out across the workers.
+    """
+    costed = sorted(((expected_cost(puzzle[1], puzzle[2]), puzzle) for puzzle in puzzles),
+                    key=lambda item: item[0], reverse=True)
+    if not costed:
+        return []
+    target = sum(cost for cost, _ in costed) / (max_workers * chunks_per_worker)
+
+    chunks = []
+    chunk, chunk_cost = [], 0
+    for cost, puzzle in costed:
+        chunk.append(puzzle)
+        chunk_cost += cost
+        if chunk_cost >= target:
+            chunks.append(chunk)
+            chunk, chunk_cost = [], 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def load_records(results_path):
+    """
+    Read an append-only results file into {idx: record}.
+
+    A later line for the same index wins. A truncated last line (interrupted
+    write) is ignored.
+    """
+    records = {}
+    if not os.path.exists(results_path):
+        return records
     
-    total_puzzles = len(gridmode)
-    puzzles = [(idx, gridmode.puzzle.iloc[idx].lower()) for idx in range(total_puzzles)]
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["idx"]] = record
+    return records
+
+
+# statuses of a results record that a resumed run solves again
+RETRY_STATUSES = ("error", "timeout")
+
+
+def load_finished(results_path):
+    """
+    Return the indices of an append-only results file that are done.
+
+    Puzzles that ended in an error or ran out of budget (timeout) are not
+    considered done, so a resumed run retries them, e.g. with a larger
+    --time-limit.
+    """
+    return {idx for idx, record in load_records(results_path).items()
+            if record["status"] not in RETRY_STATUSES}
+
+
+def open_results(results_path):
+    """Open the results file for appending, repairing a truncated last line."""
+    needs_newline = False
+    if os.path.exists(results_path) and os.path.getsize(results_path) > 0:
+        with open(results_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    
+    results_file = open(results_path, "a", encoding="utf-8")
+    if needs_newline:
+        results_file.write("\n")
+    return results_file
+
+
+def run_batch(puzzles, results_path, max_workers=None, engine="bitset", cache_path=None, limits=None,
+              profile=False, count_limit=None):
+    """
+    Solve (idx, puzzle_text, parsed) triples on a process pool and stream the
+    results. parsed is the preprocessed (attrs, clues) pair or None.
+
+    Work is submitted longest-expected-first in cost-balanced chunks (see
+    make_chunks). max_workers defaults to os.cpu_count(). limits are the
+    per-puzzle solver budgets and search options (see solve_puzzle); puzzles
+    that exceed a budget are recorded with status "timeout", separately from
+    "no_solution". profile attaches a SolverProfile to every solve (see
+    run_puzzle). count_limit switches to the solution counting mode
+    (count_puzzle) on the same pool.
+
+    Every finished puzzle is appended to results_path as one JSON line as soon
+    as it completes, so an interrupted run can be resumed: indices that already
+    have a result in the file are skipped. cache_path enables the persistent
+    SolutionCache (None bypasses it).
     
-    with ProcessPoolExecutor(max_workers=4) as executor:
-        futures = [executor.submit(solve_puzzle, idx, puzzle_text) 
-                   for idx, puzzle_text in puzzles]
+    Returns the number of puzzles processed in this run.
+    """
+    finished = load_finished(results_path)
+    pending = [puzzle for puzzle in puzzles if puzzle[0] not in finished]
+    total_puzzles = len(pending)
+    if finished:
+        print(f"Resuming: {len(finished)} puzzles already done, {total_puzzles} left")
+    
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = make_chunks(pending, max_workers)
+    
+    completed = 0
+    with open_results(results_path) as results_file, ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_chunk, chunk, engine, cache_path, limits, profile, count_limit): chunk for chunk in chunks}
         
-        for completed_idx, future in enumerate(futures):
-            print(f"Progress: {completed_idx + 1}/{total_puzzles}", end='\r')
+        for future in as_completed(futures):
             try:
-                puzzle_idx, solution = future.result()
-                if solution is None:
-                    print(f"No solution found for puzzle at index {puzzle_idx}")
+                records = future.result()
             except Exception as e:
-                print(f"Error at puzzle {completed_idx}: {e}")
+                # the whole chunk was lost (e.g. a crashed worker)
+                records = [{"idx": idx, "status": "error", "solution": None, "error": repr(e)}
+                           for idx, _, _ in futures[future]]
+            
+            for record in records:
+                completed += 1
+                print(f"Progress: {completed}/{total_puzzles}", end='\r')
+                if record["status"] == "no_solution":
+                    print(f"No solution found for puzzle at index {record['idx']}")
+                elif record["status"] == "timeout":
+                    print(f"Budget ({record['reason']}) exceeded for puzzle at index {record['idx']}")
+                elif record["status"] == "ambiguous":
+                    print(f"Multiple solutions ({record['solutions']} counted) for puzzle at index {record['idx']}")
+                elif record["status"] == "error":
+                    print(f"Error at puzzle {record['idx']}: {record['error']}")
+                results_file.write(json.dumps(record) + "\n")
+            results_file.flush()
+    
+    return total_puzzles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve the Gridmode puzzles and stream the results to a JSONL file.")
+    parser.add_argument("--data", default="Gridmode-00000-of-00001.parquet")
+    parser.add_argument("--results", default=None,
+                        help="append-only results file; already solved indices are skipped "
+                             "(default: gridmode_results.jsonl, gridmode_counts.jsonl with --count-solutions)")
+    parser.add_argument("--workers", type=int, default=None, help="pool size (default: os.cpu_count())")
+    parser.add_argument("--engine", choices=ENGINES, default="bitset")
+    parser.add_argument("--cache", default="solution_cache.sqlite",
+                        help="persistent cache of solved puzzles, keyed by puzzle text and solver version")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the solution cache (e.g. for benchmarking)")
+    parser.add_argument("--time-limit", type=float, default=None, help="wall time budget per puzzle in seconds")
+    parser.add_argument("--node-limit", type=int, default=None, help="search node budget per puzzle")
+    parser.add_argument("--propagation-limit", type=int, default=None, help="propagation call budget per puzzle")
+    parser.add_argument("--variable-order", choices=VARIABLE_ORDERS, default="mrv",
+                        help="branching variable heuristic (domwdeg: domain size over constraint weight)")
+    parser.add_argument("--value-order", choices=VALUE_ORDERS, default="index",
+                        help="value heuristic (lcv: least constraining value first)")
+    parser.add_argument("--restarts", action="store_true",
+                        help="randomized tie-breaking with Luby restarts")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for --restarts")
+    parser.add_argument("--backjumping", action="store_true", help="conflict-directed backjumping")
+    parser.add_argument("--nogoods", type=int, default=0, metavar="N",
+                        help="learn nogoods from failed search nodes, keeping at most N per puzzle")
+    parser.add_argument("--profile", metavar="PATH", default=None,
+                        help="profile every solve and write the aggregated profile as JSON to PATH "
+                             "(combine with --no-cache, cache hits are not profiled)")
+    parser.add_argument("--count-solutions", type=int, default=None, metavar="K",
+                        help="instead of solving, count the solutions of every puzzle up to K "
+                             "(2 checks uniqueness) and report unique / ambiguous / unsolvable puzzles")
+    parser.add_argument("--evaluate", action="store_true",
+                        help="score the results against the reference solutions and report accuracy and latency")
+    args = parser.parse_args()
+    if args.results is None:
+        args.results = "gridmode_counts.jsonl" if args.count_solutions is not None else "gridmode_results.jsonl"
+    
+    gridmode = pd.read_parquet(args.data)
+    
+    total_puzzles = len(gridmode)
+    # lowercase every puzzle up front; the workers preprocess their own puzzles
+    puzzle_texts = gridmode.puzzle.str.lower()
+    puzzles = [(idx, puzzle_text, None) for idx, puzzle_text in enumerate(puzzle_texts)]
+    
+    start = time.perf_counter()
+    cache_path = None if args.no_cache else args.cache
+    limits = {"time_limit": args.time_limit, "node_limit": args.node_limit,
+              "propagation_limit": args.propagation_limit,
+              "variable_order": args.variable_order, "value_order": args.value_order,
+              "restarts": args.restarts, "seed": args.seed,
+              "backjumping": args.backjumping, "nogood_limit": args.nogoods}
+    processed = run_batch(puzzles, args.results, args.workers, args.engine, cache_path, limits,
+                          args.profile is not None, args.count_solutions)
+    wall_time = time.perf_counter() - start
+    
+    if args.count_solutions is not None:
+        records = [record for idx, record in load_records(args.results).items() if idx < total_puzzles]
+        statuses = Counter(record["status"] for record in records)
+        print(f"\nunique: {statuses['unique']}  ambiguous (>= 2 solutions): {statuses['ambiguous']}  "
+              f"no solution: {statuses['no_solution']}  timeouts: {statuses['timeout']}  errors: {statuses['error']}")
+        print(f"Wall time: {wall_time:.2f}s for {processed} puzzles")
+        return
+    
+    if args.profile is not None:
+        profile = SolverProfile()
+        for record in load_records(args.results).values():
+            if "profile" in record:
+                profile.merge(record["profile"])
+        with open(args.profile, "w", encoding="utf-8") as f:
+            json.dump(profile.as_dict(), f, indent=2)
+        print_profile(profile)
+    
+    if args.evaluate:
+        records = [record for idx, record in load_records(args.results).items() if idx < total_puzzles]
+        print_report(evaluate(records, gridmode), wall_time, processed)
 
 
 if __name__ == "__main__":
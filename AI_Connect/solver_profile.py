@@ -0,0 +1,144 @@
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict
+
+
+class SolverProfile:
+    """
+    Opt-in instrumentation of a ConstraintSolver (bitset engine).
+
+    attach() shadows the solver's phase methods with timing wrappers on the
+    instance, so a solver without a profile runs the plain methods and pays
+    nothing. Recorded per solve (and summed when one profile is attached to
+    several solvers):
+    - seconds / calls per phase: _propagate, _ac3, propagator (one IR
+      propagator run, the former _revise), _backtrack, _is_consistent.
+      Times are inclusive (_propagate contains _ac3) and recursive calls of
+      a phase are timed once, at the outermost call.
+    - evaluations: constraint records evaluated by consistency checks, per
+      constraint type; propagations: propagator runs per constraint type
+    - domain_sizes: per search depth, a histogram of the (house, attribute)
+      domain sizes on entering _backtrack
+
+    as_dict() is JSON-serializable; merge() adds such a dict back in, which is
+    how the batch driver aggregates the profiles of its workers.
+    """
+
+    PHASES = ["_propagate", "_ac3", "propagator", "_backtrack", "_is_consistent"]
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = dict.fromkeys(self.PHASES, 0.0)
+        self.calls: Dict[str, int] = dict.fromkeys(self.PHASES, 0)
+        self.evaluations: Counter = Counter()
+        self.propagations: Counter = Counter()
+        self.domain_sizes: Dict[int, Counter] = defaultdict(Counter)
+        self.solves = 0
+
+        self._active: Dict[str, int] = dict.fromkeys(self.PHASES, 0)
+        self._depth = 0
+
+    def timed(self, phase: str, func: Callable) -> Callable:
+        seconds, calls, active = self.seconds, self.calls, self._active
+
+        def wrapper(*args, **kwargs):
+            calls[phase] += 1
+            if active[phase]:
+                return func(*args, **kwargs)
+            active[phase] += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds[phase] += time.perf_counter() - start
+                active[phase] -= 1
+
+        return wrapper
+
+    def attach(self, solver) -> None:
+        """Instrument one solver instance (and its IR)."""
+        self.solves += 1
+        ir = solver.ir
+        type_names = [type(constraint).__name__ for constraint in solver.constraints]
+
+        solver._propagate = self.timed("_propagate", solver._propagate)
+        solver._ac3 = self.timed("_ac3", solver._ac3)
+        solver._is_consistent = self.timed("_is_consistent", solver._is_consistent)
+
+        # both search variants count as the _backtrack phase
+        solver._backtrack = self._with_depth(solver, self.timed("_backtrack", solver._backtrack))
+        solver._backtrack_explained = self._with_depth(solver, self.timed("_backtrack", solver._backtrack_explained))
+
+        propagate = self.timed("propagator", ir.propagate)
+
+        def counted_propagate(idx, domains):
+            self.propagations[type_names[idx]] += 1
+            return propagate(idx, domains)
+
+        ir.propagate = counted_propagate
+
+        first_violation_at = ir.first_violation_at
+
+        def counted_first_violation_at(slot, positions):
+            idx = first_violation_at(slot, positions)
+            watchers = ir.watchers[slot]
+            evaluated = len(watchers) if idx < 0 else watchers.index(idx) + 1
+            for constraint_idx in watchers[:evaluated]:
+                self.evaluations[type_names[constraint_idx]] += 1
+            return idx
+
+        ir.first_violation_at = counted_first_violation_at
+
+    def _with_depth(self, solver, backtrack: Callable) -> Callable:
+        masks = solver.domains.masks
+
+        def backtrack_with_depth(assignment):
+            histogram = self.domain_sizes[self._depth]
+            for mask in masks:
+                histogram[mask.bit_count()] += 1
+            self._depth += 1
+            try:
+                return backtrack(assignment)
+            finally:
+                self._depth -= 1
+
+        return backtrack_with_depth
+
+    def as_dict(self) -> Dict:
+        return {
+            "solves": self.solves,
+            "seconds": dict(self.seconds),
+            "calls": dict(self.calls),
+            "evaluations": dict(self.evaluations),
+            "propagations": dict(self.propagations),
+            "domain_sizes": {str(depth): {str(size): count for size, count in sorted(histogram.items())}
+                             for depth, histogram in sorted(self.domain_sizes.items())},
+        }
+
+    def merge(self, data: Dict) -> None:
+        """Add a profile exported with as_dict()."""
+        self.solves += data["solves"]
+        for phase in self.PHASES:
+            self.seconds[phase] += data["seconds"].get(phase, 0.0)
+            self.calls[phase] += data["calls"].get(phase, 0)
+        self.evaluations.update(data["evaluations"])
+        self.propagations.update(data["propagations"])
+        for depth, histogram in data["domain_sizes"].items():
+            for size, count in histogram.items():
+                self.domain_sizes[int(depth)][int(size)] += count
+
+
+def print_profile(profile: SolverProfile) -> None:
+    print(f"\n=== Solver profile ({profile.solves} solves) ===")
+    print(f"{'phase':>16} {'calls':>10} {'seconds':>10}")
+    for phase in profile.PHASES:
+        print(f"{phase:>16} {profile.calls[phase]:>10} {profile.seconds[phase]:>10.3f}")
+
+    print(f"\n{'constraint type':>34} {'evaluations':>12} {'propagations':>13}")
+    for type_name in sorted(set(profile.evaluations) | set(profile.propagations)):
+        print(f"{type_name:>34} {profile.evaluations[type_name]:>12} {profile.propagations[type_name]:>13}")
+
+    print(f"\n{'depth':>6} {'domains':>8} {'mean size':>10}")
+    for depth, histogram in sorted(profile.domain_sizes.items()):
+        total = sum(histogram.values())
+        mean = sum(size * count for size, count in histogram.items()) / total
+        print(f"{depth:>6} {total:>8} {mean:>10.2f}")
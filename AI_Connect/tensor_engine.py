@@ -0,0 +1,226 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bitset_domains import BitsetDomains
+from constraint_ir import (ConstraintIR, KIND_FALSE, KIND_OFFSET, KIND_DISTANCE,
+                           KIND_BEFORE, KIND_AT, KIND_NOT_AT)
+
+
+def _shift(houses: np.ndarray, k: int) -> np.ndarray:
+    """Shift along the house axis: result[h] = houses[h - k], zero filled."""
+    if k == 0:
+        return houses
+    shifted = np.zeros_like(houses)
+    if k > 0:
+        shifted[k:] = houses[:-k]
+    else:
+        shifted[:k] = houses[-k:]
+    return shifted
+
+
+class TensorEngine:
+    """
+    NumPy propagation and search engine for ConstraintSolver.
+
+    The whole state is one boolean tensor state[house, attribute, value]
+    (values padded to the IR value stride). Reshaped to (house, slot) its
+    columns are exactly the ConstraintIR value slots, so the houses that can
+    still hold a value are one column.
+
+    One propagation round is a handful of array operations:
+    - all-different: a value column sum of 1 forces the value into that house,
+      a row sum of 1 eliminates the value from every other house
+    - relational records: the IR records are grouped by (kind, param); each
+      group gathers its two slot columns, prunes them with shifted / and-ed
+      masks over the house axis and scatters the result back with a
+      logical_and.at, so several records on one slot accumulate correctly
+    Rounds repeat until the number of possible (house, attribute, value) cells
+    stops shrinking.
+
+    Search is MRV over (house, attribute) cells with a state copy per decision
+    (the tensor is a few hundred bytes). check_budget, if given, is called with
+    (backtrack_count, propagation_calls) at every search node and may raise to
+    abort the search.
+    """
+
+    def __init__(self, domains: BitsetDomains, ir: ConstraintIR,
+                 check_budget: Optional[Callable[[int, int], None]] = None):
+        self.domains = domains
+        self.check_budget = check_budget
+        self.num_House = domains.num_House
+        self.num_attributes = domains.num_attributes
+        self.value_stride = ir.value_stride
+
+        self.valid = np.zeros((self.num_attributes, self.value_stride), dtype=bool)
+        for attr_idx, values in enumerate(domains.values):
+            self.valid[attr_idx, :len(values)] = True
+
+        self.always_fails = False
+        self.groups: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+        at_rows: List[int] = []
+        at_cols: List[int] = []
+
+        grouped: Dict[Tuple[int, int], Tuple[List[int], List[int]]] = {}
+        for idx in range(ir.count):
+            kind, param = ir.kind[idx], ir.param[idx]
+            slot1, slot2 = ir.slot1[idx], ir.slot2[idx]
+            if kind == KIND_FALSE or (kind == KIND_AT and param > self.num_House):
+                self.always_fails = True
+                continue
+            if kind == KIND_AT:
+                # everything else in house `param` for that attribute is ruled out
+                attr_idx, value_idx = ir.unpack(slot1)
+                for other_idx in range(self.value_stride):
+                    if other_idx != value_idx:
+                        at_rows.append(param - 1)
+                        at_cols.append(ir.slot(attr_idx, other_idx))
+            if kind in (KIND_OFFSET, KIND_DISTANCE, KIND_BEFORE, KIND_AT, KIND_NOT_AT):
+                slots1, slots2 = grouped.setdefault((kind, param), ([], []))
+                slots1.append(slot1)
+                slots2.append(slot2)
+
+        for key, (slots1, slots2) in grouped.items():
+            self.groups[key] = (np.array(slots1, dtype=np.intp), np.array(slots2, dtype=np.intp))
+        self.at_rows = np.array(at_rows, dtype=np.intp)
+        self.at_cols = np.array(at_cols, dtype=np.intp)
+
+        self.backtrack_count = 0
+        self.propagation_calls = 0
+        self.round_count = 0
+
+    def initial_state(self) -> np.ndarray:
+        state = np.zeros((self.num_House, self.num_attributes, self.value_stride), dtype=bool)
+        for var, mask in enumerate(self.domains.masks):
+            house_idx, attr_idx = divmod(var, self.num_attributes)
+            for value_idx in range(self.value_stride):
+                state[house_idx, attr_idx, value_idx] = bool(mask >> value_idx & 1)
+        return state
+
+    # ------------------------------------------------------------------
+    # propagation
+    # ------------------------------------------------------------------
+
+    def propagate(self, state: np.ndarray) -> bool:
+        """Propagate in place to a fixpoint. Returns False on a wipe-out."""
+        self.propagation_calls += 1
+        if self.always_fails:
+            return False
+
+        flat = state.reshape(self.num_House, -1)
+        if len(self.at_rows):
+            flat[self.at_rows, self.at_cols] = False
+
+        size = int(state.sum())
+        while True:
+            self.round_count += 1
+            if not self._all_different(state) or not self._relations(flat):
+                return False
+            new_size = int(state.sum())
+            if new_size == size:
+                return True
+            size = new_size
+
+    def _all_different(self, state: np.ndarray) -> bool:
+        # hidden singles: a value column sum of 1 forces the value
+        column_sums = state.sum(axis=0)
+        if (column_sums[self.valid] == 0).any():
+            return False
+        holders = state & ((column_sums == 1) & self.valid)
+        forced = holders.sum(axis=2)
+        if (forced > 1).any():
+            return False
+        state[...] = np.where((forced == 1)[..., None], holders, state)
+
+        # naked singles: a row sum of 1 eliminates the value elsewhere
+        row_sums = state.sum(axis=2)
+        if (row_sums == 0).any():
+            return False
+        singles = state & (row_sums == 1)[..., None]
+        taken = singles.sum(axis=0)
+        if (taken > 1).any():
+            return False
+        state &= ~((taken > 0) & ~singles)
+        return True
+
+    def _relations(self, flat: np.ndarray) -> bool:
+        flat_t = flat.T
+        for (kind, param), (slots1, slots2) in self.groups.items():
+            houses1 = flat[:, slots1]
+
+            if kind == KIND_AT:
+                pruned1 = np.zeros_like(houses1)
+                pruned1[param - 1] = houses1[param - 1]
+                np.logical_and.at(flat_t, slots1, pruned1.T)
+                continue
+            if kind == KIND_NOT_AT:
+                pruned1 = houses1.copy()
+                if param <= self.num_House:
+                    pruned1[param - 1] = False
+                np.logical_and.at(flat_t, slots1, pruned1.T)
+                continue
+
+            houses2 = flat[:, slots2]
+            if kind == KIND_OFFSET:
+                # p2 == p1 + param
+                pruned1 = houses1 & _shift(houses2, -param)
+                pruned2 = houses2 & _shift(pruned1, param)
+            elif kind == KIND_DISTANCE:
+                pruned1 = houses1 & (_shift(houses2, param) | _shift(houses2, -param))
+                pruned2 = houses2 & (_shift(pruned1, param) | _shift(pruned1, -param))
+            else:  # KIND_BEFORE: p1 < p2
+                later2 = _shift(np.logical_or.accumulate(houses2[::-1], axis=0)[::-1], -1)
+                pruned1 = houses1 & later2
+                earlier1 = _shift(np.logical_or.accumulate(pruned1, axis=0), 1)
+                pruned2 = houses2 & earlier1
+
+            np.logical_and.at(flat_t, slots1, pruned1.T)
+            np.logical_and.at(flat_t, slots2, pruned2.T)
+
+        return True
+
+    # ------------------------------------------------------------------
+    # search
+    # ------------------------------------------------------------------
+
+    def solve(self) -> Optional[Dict[int, Dict[str, str]]]:
+        state = self.initial_state()
+        result = self._search(state)
+        if result is None:
+            return None
+        return self.decode(result)
+
+    def _search(self, state: np.ndarray) -> Optional[np.ndarray]:
+        if not self.propagate(state):
+            return None
+
+        row_sums = state.sum(axis=2)
+        if (row_sums == 1).all():
+            return state
+
+        self.backtrack_count += 1
+        if self.check_budget is not None:
+            self.check_budget(self.backtrack_count, self.propagation_calls)
+
+        # MRV over the undecided (house, attribute) cells
+        candidates = np.where(row_sums > 1, row_sums, np.iinfo(row_sums.dtype).max)
+        house_idx, attr_idx = np.unravel_index(np.argmin(candidates), candidates.shape)
+
+        for value_idx in np.flatnonzero(state[house_idx, attr_idx]):
+            child = state.copy()
+            child[house_idx, attr_idx] = False
+            child[house_idx, attr_idx, value_idx] = True
+            result = self._search(child)
+            if result is not None:
+                return result
+
+        return None
+
+    def decode(self, state: np.ndarray) -> Dict[int, Dict[str, str]]:
+        solution = {}
+        for house_idx in range(self.num_House):
+            solution[house_idx + 1] = {}
+            for attr_idx, attr_key in enumerate(self.domains.attr_keys):
+                value_idx = int(np.argmax(state[house_idx, attr_idx]))
+                solution[house_idx + 1][attr_key] = self.domains.values[attr_idx][value_idx]
+        return solution
@@ -0,0 +1,84 @@
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+class ValueMatcher:
+    """
+    Aho-Corasick automaton over the (normalized) attribute values of a puzzle.
+
+    Finds the value mentioned in a clue part in one pass over the text instead
+    of one substring test per value. The result is the same as the old
+    per-value loop: the longest normalized value occurring anywhere in the
+    text wins, ties go to the value listed first (attribute order, then value
+    order). Values that normalize to the empty string never match.
+    """
+
+    def __init__(self, attributes: Dict[str, List[str]], normalized_values: Dict[str, List[str]]):
+        # entries[i] = (length, value, key); i is the attribute/value order used for ties
+        self.entries: List[Tuple[int, str, str]] = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.outputs: List[List[int]] = [[]]
+
+        for key, values in attributes.items():
+            for value, pattern in zip(values, normalized_values[key]):
+                if not pattern:
+                    continue
+                self._insert(pattern, len(self.entries))
+                self.entries.append((len(pattern), value, key))
+
+        self.fail = self._build_fail_links()
+
+    def _insert(self, pattern: str, entry_id: int) -> None:
+        node = 0
+        for char in pattern:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][char] = nxt
+                self.goto.append({})
+                self.outputs.append([])
+            node = nxt
+        self.outputs[node].append(entry_id)
+
+    def _build_fail_links(self) -> List[int]:
+        fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                state = fail[node]
+                while state and char not in self.goto[state]:
+                    state = fail[state]
+                fail[child] = self.goto[state].get(char, 0)
+                # every pattern ending at the fail target also ends here
+                self.outputs[child] = self.outputs[child] + self.outputs[fail[child]]
+                queue.append(child)
+        return fail
+
+    def longest(self, text: str, key: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        Return the (value, key) of the longest value contained in text, or None.
+
+        With key, only values of that attribute are considered.
+        """
+        goto, fail, outputs, entries = self.goto, self.fail, self.outputs, self.entries
+        best_id = -1
+        best_length = 0
+
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for entry_id in outputs[node]:
+                length, _, entry_key = entries[entry_id]
+                if key is not None and entry_key != key:
+                    continue
+                if length > best_length or (length == best_length and entry_id < best_id):
+                    best_id = entry_id
+                    best_length = length
+
+        if best_id < 0:
+            return None
+        _, value, entry_key = entries[best_id]
+        return (value, entry_key)